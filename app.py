@@ -1,14 +1,26 @@
 import streamlit as st
-import requests
 import pandas as pd
-from datetime import datetime, date
+import numpy as np
+from datetime import datetime, date, timedelta
 import os
-import time
 import pytz
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 from config.settings import settings
 from config.database import supabase
+from config.api_football import api_get
+from tabela_odds import (
+    normalizar_odds,
+    odds_principais_por_jogo,
+    melhores_odds_por_jogo,
+    atualizacoes_por_jogo
+)
+from regras_selecao import carregar_regras
+from historico_odds import registrar_captura_odds
+from jogos_banco import salvar_jogos_banco, montar_dados_jogo, consultar_por_ids
 
 # Validar configurações (manter aqui, pois é uma validação de backend)
 try:
@@ -19,16 +31,6 @@ except ValueError as e:
     st.error(f"Erro de configuração: {e}")
     st.stop()  # Interrompe a execução do script
 
-# Token da API
-TOKEN_API = settings.api_key
-URL_BASE = "https://v3.football.api-sports.io"
-
-# Headers para requisições
-cabecalhos = {
-    'X-RapidAPI-Key': TOKEN_API,
-    'X-RapidAPI-Host': 'v3.football.api-sports.io'
-}
-
 # Lista de bookmakers comuns
 BOOKMAKERS = {
     8: "Bet365",
@@ -39,146 +41,256 @@ BOOKMAKERS = {
 # Fuso horário de Brasília
 TIMEZONE_BRASILIA = pytz.timezone('America/Sao_Paulo')
 
+# Status de jogos encerrados (usados para detectar estatísticas desatualizadas)
+STATUS_FINALIZADOS = ['FT', 'AET', 'PEN']
+
+# Estatísticas exibidas por time na tabela de jogos ("casa - fora")
+COLUNAS_ESTATISTICAS = ['jogos', 'vitorias', 'derrotas', 'gols_marcados', 'gols_sofridos', 'jogos_sem_marcar']
+
+# Estatísticas já buscadas por tripla (time_id, liga_id, temporada) -> (momento, stats), reaproveitadas
+# entre buscas com seleções sobrepostas. Em ordem de gravação: as vencidas e as mais antigas
+# (acima do limite) saem pela frente
+estatisticas_memorizadas = OrderedDict()
+TTL_ESTATISTICAS_MEMORIZADAS = timedelta(hours=1)
+MAX_ESTATISTICAS_MEMORIZADAS = 5000
+trava_estatisticas_memorizadas = threading.Lock()
+
+# Descrição de cada status curto da API (a tabela jogos guarda só o curto)
+STATUS_DESCRICAO = {
+    'TBD': 'Time To Be Defined',
+    'NS': 'Not Started',
+    '1H': 'First Half',
+    'HT': 'Halftime',
+    '2H': 'Second Half',
+    'ET': 'Extra Time',
+    'BT': 'Break Time',
+    'P': 'Penalty In Progress',
+    'SUSP': 'Match Suspended',
+    'INT': 'Match Interrupted',
+    'FT': 'Match Finished',
+    'AET': 'Match Finished',
+    'PEN': 'Match Finished',
+    'PST': 'Match Postponed',
+    'CANC': 'Match Cancelled',
+    'ABD': 'Match Abandoned',
+    'AWD': 'Technical Loss',
+    'WO': 'WalkOver',
+    'LIVE': 'In Progress',
+}
+
+# Limites da API/PostgREST usados na leitura dos jogos do banco
+MAX_IDS_POR_CONSULTA_FIXTURES = 20
+MAX_LINHAS_POR_CONSULTA_BANCO = 1000
+
+# Triplas (time_id, liga_id, temporada) com atualização em segundo plano em andamento
+atualizacoes_em_andamento = set()
+trava_atualizacoes = threading.Lock()
+
+# Datas com gravação de jogos em segundo plano em andamento
+gravacoes_jogos_em_andamento = set()
+trava_gravacoes_jogos = threading.Lock()
+
 
 
 def verificar_jogos_salvos_hoje(data_selecionada):
-    """Verifica se já existem jogos salvos para a data selecionada"""
+    """Verifica se os jogos da data já foram gravados por completo no banco
+
+    Vale o registro em datas_sincronizadas, feito só quando a gravação termina sem
+    erros; enquanto a gravação em segundo plano da data está em andamento, não.
+    """
+    with trava_gravacoes_jogos:
+        if data_selecionada in gravacoes_jogos_em_andamento:
+            return False
     try:
-        resultado = supabase.table('jogos').select("id").eq('data', data_selecionada).limit(1).execute()
+        resultado = supabase.table('datas_sincronizadas').select("data").eq('data', data_selecionada).limit(1).execute()
         return len(resultado.data) > 0
     except Exception as e:
         st.warning(f"Erro ao verificar jogos salvos: {str(e)}")
         return False
 
 
-def verificar_time_existe(time_id):
-    """Verifica se um time existe no banco de dados"""
-    try:
-        resultado = supabase.table('times').select("id").eq('id', time_id).execute()
-        return len(resultado.data) > 0
-    except Exception as e:
-        print(f"Erro ao verificar time {time_id}: {str(e)}")
-        return False
+def salvar_jogos_banco_em_segundo_plano(jogos, data_selecionada):
+    """Grava os jogos da data numa thread em segundo plano (write-behind)
+
+    A tabela é exibida com os dados da API sem esperar o banco; a gravação aparece na
+    próxima leitura da data. Datas que já estão sendo gravadas são ignoradas.
+    """
+    with trava_gravacoes_jogos:
+        if data_selecionada in gravacoes_jogos_em_andamento:
+            return None
+        gravacoes_jogos_em_andamento.add(data_selecionada)
+
+    def gravar():
+        try:
+            salvar_jogos_banco(jogos, data_selecionada)
+        except Exception as e:
+            print(f"Erro ao salvar jogos de {data_selecionada} em segundo plano: {str(e)}")
+        finally:
+            with trava_gravacoes_jogos:
+                gravacoes_jogos_em_andamento.discard(data_selecionada)
+
+    thread = threading.Thread(target=gravar, name="gravacao-jogos", daemon=True)
+    thread.start()
+    return thread
 
 
-def buscar_e_salvar_time(time_id):
-    """Busca um time na API e salva no banco"""
-    url = f"{URL_BASE}/teams"
-    parametros = {'id': time_id}
+def montar_fixture_banco(jogo, times, ligas, paises):
+    """Converte uma linha da tabela jogos no formato de um item da resposta de /fixtures"""
+    casa = times[jogo['time_casa_id']]
+    fora = times[jogo['time_fora_id']]
+    liga = ligas[jogo['liga_id']]
+    pais = paises.get(liga.get('pais_id')) or {}
+    horario = pd.Timestamp(jogo['horario']).tz_convert('UTC')
 
+    return {
+        'fixture': {
+            'id': jogo['id'],
+            'referee': jogo.get('arbitro'),
+            'timezone': 'UTC',
+            'date': horario.isoformat(),
+            'timestamp': int(horario.timestamp()),
+            'venue': {'name': jogo.get('estadio'), 'city': jogo.get('cidade')},
+            'status': {'long': STATUS_DESCRICAO.get(jogo['status'], jogo['status']), 'short': jogo['status']}
+        },
+        'league': {
+            'id': liga['id'],
+            'name': liga['nome'],
+            'country': pais.get('nome', 'World'),
+            'logo': liga.get('logo_url'),
+            'flag': pais.get('flag_url'),
+            'season': jogo['temporada'],
+            'round': jogo.get('rodada')
+        },
+        'teams': {
+            'home': {'id': casa['id'], 'name': casa['nome'], 'logo': casa.get('logo_url')},
+            'away': {'id': fora['id'], 'name': fora['nome'], 'logo': fora.get('logo_url')}
+        },
+        'goals': {'home': jogo.get('gols_casa'), 'away': jogo.get('gols_fora')}
+    }
+
+
+def buscar_jogos_banco(data_selecionada, status='NS'):
+    """Monta a resposta de /fixtures da data a partir das tabelas jogos, times, ligas e países
+
+    Times, ligas e países são lidos em lote (uma consulta in_ por tabela). Retorna None
+    se a leitura falhar ou se faltar o time/liga de algum jogo, para a API ser usada.
+    """
     try:
-        resposta = requests.get(url, headers=cabecalhos, params=parametros)
-        if resposta.status_code == 200:
-            dados = resposta.json()
-            times = dados.get('response', [])
-            if times:
-                time_data = times[0]
-                time_info = time_data.get('team', {})
-
-                dados_time = {
-                    'id': time_info.get('id'),
-                    'nome': time_info.get('name'),
-                    'codigo': time_info.get('code'),
-                    'logo_url': time_info.get('logo'),
-                    'ano_fundacao': time_info.get('founded'),
-                    'ativo': True,
-                    'atualizado_em': datetime.now().isoformat()
-                }
+        jogos = []
+        while True:
+            resultado = supabase.table('jogos').select("*") \
+                .eq('data', data_selecionada) \
+                .eq('status', status) \
+                .order('id') \
+                .range(len(jogos), len(jogos) + MAX_LINHAS_POR_CONSULTA_BANCO - 1) \
+                .execute()
+            jogos.extend(resultado.data)
+            if len(resultado.data) < MAX_LINHAS_POR_CONSULTA_BANCO:
+                break
 
-                supabase.table('times').insert(dados_time).execute()
-                return True
-        return False
+        ids_times = [jogo[coluna] for jogo in jogos for coluna in ('time_casa_id', 'time_fora_id')]
+        times = consultar_por_ids('times', "id, nome, logo_url", ids_times)
+        ligas = consultar_por_ids('ligas', "id, nome, logo_url, pais_id", [jogo['liga_id'] for jogo in jogos])
+        paises = consultar_por_ids('paises', "id, nome, flag_url",
+                                   [liga['pais_id'] for liga in ligas.values() if liga.get('pais_id')])
+
+        response = [montar_fixture_banco(jogo, times, ligas, paises) for jogo in jogos]
+    except KeyError as e:
+        print(f"Jogos de {data_selecionada} incompletos no banco (id {e} não encontrado), usando a API")
+        return None
     except Exception as e:
-        print(f"Erro ao buscar/salvar time {time_id}: {str(e)}")
-        return False
+        print(f"Erro ao ler jogos de {data_selecionada} do banco: {str(e)}")
+        return None
 
+    return {
+        'get': 'fixtures',
+        'parameters': {'date': data_selecionada, 'status': status},
+        'errors': [],
+        'results': len(response),
+        'response': response
+    }
 
-def salvar_jogos_banco(jogos, data_selecionada):
-    """Salva os jogos no banco de dados"""
-    jogos_salvos = 0
-    times_novos = 0
 
-    for jogo in jogos:
-        try:
-            fixture = jogo['fixture']
-            teams = jogo['teams']
-            league = jogo['league']
-
-            # Verificar se os times existem
-            time_casa_id = teams['home']['id']
-            time_fora_id = teams['away']['id']
-
-            # Verificar e criar time da casa se necessário
-            if not verificar_time_existe(time_casa_id):
-                print(f"Time {teams['home']['name']} não encontrado. Buscando...")
-                if buscar_e_salvar_time(time_casa_id):
-                    times_novos += 1
-                    time.sleep(0.1)  # Pequeno delay
-
-            # Verificar e criar time de fora se necessário
-            if not verificar_time_existe(time_fora_id):
-                print(f"Time {teams['away']['name']} não encontrado. Buscando...")
-                if buscar_e_salvar_time(time_fora_id):
-                    times_novos += 1
-                    time.sleep(0.1)  # Pequeno delay
-
-            dados_jogo = {
-                'id': fixture['id'],
-                'data': data_selecionada,
-                'horario': fixture['date'],
-                'time_casa_id': time_casa_id,
-                'time_fora_id': time_fora_id,
-                'liga_id': league['id'],
-                'temporada': league['season'],
-                'status': fixture['status']['short'],
-                'rodada': league.get('round'),
-                'arbitro': fixture.get('referee'),
-                'estadio': fixture.get('venue', {}).get('name'),
-                'cidade': fixture.get('venue', {}).get('city'),
-                'gols_casa': teams['home'].get('goals'),
-                'gols_fora': teams['away'].get('goals'),
-                'atualizado_em': datetime.now().isoformat()
-            }
+def buscar_fixtures_por_ids(ids_jogos):
+    """Fixtures atuais da API para os ids informados (`/fixtures?ids=`, até 20 por chamada)"""
+    lotes = [ids_jogos[inicio:inicio + MAX_IDS_POR_CONSULTA_FIXTURES]
+             for inicio in range(0, len(ids_jogos), MAX_IDS_POR_CONSULTA_FIXTURES)]
+    fixtures = {}
 
-            # Tentar inserir ou atualizar
-            supabase.table('jogos').upsert(dados_jogo).execute()
-            jogos_salvos += 1
+    def buscar_lote(lote):
+        resposta = api_get('/fixtures', params={'ids': '-'.join(str(id_jogo) for id_jogo in lote)}, use_cache=False)
+        if resposta.status_code != 200:
+            raise RuntimeError(f"status {resposta.status_code}")
+        return resposta.json().get('response', [])
 
-        except Exception as e:
-            print(f"Erro ao salvar jogo {fixture.get('id')}: {str(e)}")
+    with ThreadPoolExecutor(max_workers=settings.api_max_workers) as executor:
+        futuros = {executor.submit(buscar_lote, lote): lote for lote in lotes}
+        for futuro in as_completed(futuros):
+            try:
+                fixtures.update((jogo['fixture']['id'], jogo) for jogo in futuro.result())
+            except Exception as e:
+                print(f"Erro ao buscar status dos jogos {futuros[futuro]}: {str(e)}")
 
-    if times_novos > 0:
-        st.info(f"✅ {times_novos} novos times foram adicionados automaticamente")
+    return fixtures
 
-    return jogos_salvos
+
+def atualizar_status_jogos(dados_jogos, data_selecionada, agora=None):
+    """Confere na API só os jogos do banco cujo horário já passou e que ainda constam como não iniciados
+
+    Os que mudaram de status saem da lista e são gravados no banco, então na próxima
+    leitura já não entram na consulta. Jogos futuros não gastam chamadas da API.
+    Retorna (dados_jogos, quantidade de jogos que mudaram).
+    """
+    agora = agora or datetime.now(pytz.utc).timestamp()
+    ids_iniciados = [jogo['fixture']['id'] for jogo in dados_jogos['response'] if jogo['fixture']['timestamp'] <= agora]
+    if not ids_iniciados:
+        return dados_jogos, 0
+
+    atuais = buscar_fixtures_por_ids(ids_iniciados)
+    mudaram = [jogo for jogo in atuais.values() if jogo['fixture']['status']['short'] != 'NS']
+    if not mudaram:
+        return dados_jogos, 0
+
+    try:
+        supabase.table('jogos').upsert([montar_dados_jogo(jogo, data_selecionada) for jogo in mudaram]).execute()
+    except Exception as e:
+        print(f"Erro ao gravar status dos jogos de {data_selecionada}: {str(e)}")
+
+    ids_mudaram = {jogo['fixture']['id'] for jogo in mudaram}
+    response = [jogo for jogo in dados_jogos['response'] if jogo['fixture']['id'] not in ids_mudaram]
+    return dict(dados_jogos, results=len(response), response=response), len(ids_mudaram)
 
 
 @st.cache_data(ttl=300)  # Cache por 5 minutos
 def buscar_jogos_por_data(data_selecionada):
-    """Obtém os jogos de uma data específica"""
-    # Verificar se já temos jogos salvos para esta data
+    """Obtém os jogos não iniciados de uma data
+
+    Se a data já foi sincronizada, os jogos vêm do banco e a API só é consultada para
+    o status dos jogos que já deveriam ter começado; senão, vêm de /fixtures.
+    """
     if verificar_jogos_salvos_hoje(data_selecionada):
-        st.info("📁 Carregando jogos do banco de dados (já consultados hoje)")
-        # Aqui você poderia buscar do banco, mas por ora mantemos a API
-        # para garantir dados atualizados de status
+        dados = buscar_jogos_banco(data_selecionada)
+        if dados is not None:
+            dados, iniciados = atualizar_status_jogos(dados, data_selecionada)
+            st.info(f"📁 {dados['results']} jogos carregados do banco de dados"
+                    + (f" ({iniciados} já iniciados removidos)" if iniciados else ""))
+            return dados
 
-    url = f"{URL_BASE}/fixtures"
     parametros = {
         'date': data_selecionada,
         'status': 'NS'  # Not Started
     }
 
     try:
-        resposta = requests.get(url, headers=cabecalhos, params=parametros)
+        resposta = api_get('/fixtures', params=parametros)
         if resposta.status_code == 200:
             dados = resposta.json()
             jogos = dados.get('response', [])
 
-            # Salvar jogos no banco se ainda não foram salvos hoje
-            if jogos and not verificar_jogos_salvos_hoje(data_selecionada):
-                jogos_salvos = salvar_jogos_banco(jogos, data_selecionada)
-                if jogos_salvos > 0:
-                    st.success(f"✅ {jogos_salvos} jogos salvos no banco de dados")
+            # A data não está (completa) no banco: grava em segundo plano para as próximas
+            # leituras virem do banco, sem atrasar a exibição
+            if jogos and salvar_jogos_banco_em_segundo_plano(jogos, data_selecionada):
+                st.info(f"💾 Salvando {len(jogos)} jogos no banco de dados em segundo plano")
 
             return dados
         else:
@@ -189,66 +301,295 @@ def buscar_jogos_por_data(data_selecionada):
         return None
 
 
-@st.cache_data(ttl=300)
-def buscar_todas_odds_por_data_e_bookmaker(data_selecionada, id_bookmaker):
-    """Obtém todas as odds de uma data específica e bookmaker (com paginação)"""
-    url = f"{URL_BASE}/odds"
+def buscar_pagina_odds(data_selecionada, id_bookmaker, pagina):
+    """Busca uma única página de odds. Não usa Streamlit, então pode rodar em threads.
+
+    Retorna (status_code, dados) - dados é None quando a resposta não é 200.
+    """
+    parametros = {
+        'date': data_selecionada,
+        'bookmaker': id_bookmaker,
+        'page': pagina
+    }
+    resposta = api_get('/odds', params=parametros)
+    if resposta.status_code != 200:
+        return resposta.status_code, None
+    return resposta.status_code, resposta.json()
+
+
+def buscar_todas_odds_por_data_e_bookmaker(data_selecionada, id_bookmaker, paralelo=True):
+    """Obtém todas as odds de uma data específica e bookmaker (com paginação)
+
+    A primeira página informa `paging.total`; com `paralelo=True` as demais páginas
+    são buscadas por um pool limitado de threads (o limite por minuto da conta é
+    respeitado pelo rate limiter de api_get) e o resultado é montado na ordem das páginas.
+    """
     todas_odds = []
-    pagina = 1
     total_pages = 1
     # st.sidebar.empty() não deve estar aqui, pois esta função é chamada do app_odds_streamlit.py
     # O placeholder_progresso deve ser passado como argumento ou gerenciado na UI.
     # Por simplicidade, vou usar um st.empty() genérico aqui, mas o ideal seria a UI gerenciar.
     placeholder_progresso = st.empty()  # temporário para evitar erro aqui se executado isolado
 
-    while True:
-        parametros = {
-            'date': data_selecionada,
-            'bookmaker': id_bookmaker,
-            'page': pagina
+    try:
+        status_code, dados = buscar_pagina_odds(data_selecionada, id_bookmaker, 1)
+    except Exception as e:
+        st.error(f"Erro na requisição de odds (página 1): {str(e)}")
+        status_code, dados = None, None
+
+    if status_code is not None and dados is None:
+        st.error(f"Erro ao buscar odds na página 1: {status_code}")
+
+    if dados and dados.get('response'):
+        todas_odds.extend(dados['response'])
+        total_pages = dados.get('paging', {}).get('total', 1)
+        placeholder_progresso.info(f"📊 Carregado 1/{total_pages} páginas de odds")
+
+        paginas_restantes = list(range(2, total_pages + 1))
+        odds_por_pagina = {}
+
+        if paralelo and paginas_restantes:
+            # O ritmo das requisições é controlado pelo rate limiter global em api_get
+            with ThreadPoolExecutor(max_workers=settings.api_max_workers) as executor:
+                futuros = {
+                    executor.submit(buscar_pagina_odds, data_selecionada, id_bookmaker, pagina): pagina
+                    for pagina in paginas_restantes
+                }
+
+                for carregadas, futuro in enumerate(as_completed(futuros), start=2):
+                    pagina = futuros[futuro]
+                    try:
+                        status_code, dados_pagina = futuro.result()
+                        if dados_pagina is None:
+                            st.error(f"Erro ao buscar odds na página {pagina}: {status_code}")
+                        else:
+                            odds_por_pagina[pagina] = dados_pagina.get('response', [])
+                    except Exception as e:
+                        st.error(f"Erro na requisição de odds (página {pagina}): {str(e)}")
+                    placeholder_progresso.info(f"📊 Carregado {carregadas}/{total_pages} páginas de odds")
+        else:
+            for pagina in paginas_restantes:
+                try:
+                    status_code, dados_pagina = buscar_pagina_odds(data_selecionada, id_bookmaker, pagina)
+                    if dados_pagina is None:
+                        st.error(f"Erro ao buscar odds na página {pagina}: {status_code}")
+                        break
+                    if not dados_pagina.get('response'):
+                        break
+                    odds_por_pagina[pagina] = dados_pagina['response']
+                    placeholder_progresso.info(f"📊 Carregado {pagina}/{total_pages} páginas de odds")
+                except Exception as e:
+                    st.error(f"Erro na requisição de odds (página {pagina}): {str(e)}")
+                    break
+
+        # Mesclar na ordem das páginas, independente da ordem de chegada
+        for pagina in sorted(odds_por_pagina):
+            todas_odds.extend(odds_por_pagina[pagina])
+
+    placeholder_progresso.empty()
+
+    return {
+        'response': todas_odds,
+        'paging': {
+            'current': total_pages,
+            'total': total_pages
         }
+    }
 
-        try:
-            resposta = requests.get(url, headers=cabecalhos, params=parametros)
-            if resposta.status_code == 200:
-                dados = resposta.json()
 
-                if not dados.get('response'):
-                    break
+@st.cache_data(ttl=300)
+def buscar_tabela_odds(data_selecionada, id_bookmaker):
+    """Busca todas as odds da data/bookmaker e devolve a tabela longa normalizada
 
-                todas_odds.extend(dados['response'])
+    O JSON cru das páginas é descartado aqui; apenas a tabela compacta fica em cache
+    e no session_state. Cada busca real é registrada no histórico de odds.
+    Retorna (tabela_odds, atualizacoes) - `atualizacoes` traz o `update` de cada
+    jogo/bookmaker, usado pela atualização incremental.
+    """
+    dados_odds = buscar_todas_odds_por_data_e_bookmaker(data_selecionada, id_bookmaker)
+    tabela_odds = normalizar_odds(dados_odds)
+    registrar_captura_odds(data_selecionada, tabela_odds)
+    return tabela_odds, atualizacoes_por_jogo(dados_odds)
 
-                paging = dados.get('paging', {})
-                current_page = paging.get('current', 1)
-                total_pages = paging.get('total', 1)
 
-                placeholder_progresso.info(f"📊 Carregado {current_page}/{total_pages} páginas de odds")
+def buscar_odds_varios_bookmakers(data_selecionada, ids_bookmakers):
+    """Busca as odds de vários bookmakers ao mesmo tempo, página a página
 
-                if current_page >= total_pages:
-                    break
+    As primeiras páginas de todos os bookmakers vão juntas para o pool de threads;
+    conforme cada uma informa `paging.total`, as páginas restantes entram no mesmo
+    pool. As threads só fazem requisições; erros e progresso são mostrados aqui.
+    Retorna {id_bookmaker: {'response': [...]}} com as páginas em ordem.
+    """
+    placeholder_progresso = st.empty()
+    paginas_por_bookmaker = {id_bookmaker: {} for id_bookmaker in ids_bookmakers}
 
-                pagina += 1
-                time.sleep(0.1)
+    with ThreadPoolExecutor(max_workers=settings.api_max_workers) as executor:
+        futuros = {
+            executor.submit(buscar_pagina_odds, data_selecionada, id_bookmaker, 1): (id_bookmaker, 1)
+            for id_bookmaker in ids_bookmakers
+        }
+        total_paginas = len(futuros)
+        carregadas = 0
+
+        while futuros:
+            futuro = next(as_completed(futuros))
+            id_bookmaker, pagina = futuros.pop(futuro)
+            carregadas += 1
+            try:
+                status_code, dados = futuro.result()
+            except Exception as e:
+                st.error(f"Erro na requisição de odds (bookmaker {id_bookmaker}, página {pagina}): {str(e)}")
+                continue
 
-            else:
-                st.error(f"Erro ao buscar odds na página {pagina}: {resposta.status_code}")
-                break
+            if dados is None:
+                st.error(f"Erro ao buscar odds do bookmaker {id_bookmaker} na página {pagina}: {status_code}")
+                continue
 
-        except Exception as e:
-            st.error(f"Erro na requisição de odds (página {pagina}): {str(e)}")
-            break
+            paginas_por_bookmaker[id_bookmaker][pagina] = dados.get('response', [])
+            if pagina == 1:
+                for proxima in range(2, dados.get('paging', {}).get('total', 1) + 1):
+                    futuros[executor.submit(buscar_pagina_odds, data_selecionada, id_bookmaker, proxima)] = \
+                        (id_bookmaker, proxima)
+                    total_paginas += 1
 
-    placeholder_progresso.empty()
+            placeholder_progresso.info(
+                f"📊 Carregado {carregadas}/{total_paginas} páginas de odds ({len(ids_bookmakers)} bookmakers)")
 
+    placeholder_progresso.empty()
     return {
-        'response': todas_odds,
-        'paging': {
-            'current': total_pages,
-            'total': total_pages
-        }
+        id_bookmaker: {'response': [item for pagina in sorted(paginas) for item in paginas[pagina]]}
+        for id_bookmaker, paginas in paginas_por_bookmaker.items()
     }
 
 
+@st.cache_data(ttl=300)
+def buscar_tabela_odds_varios_bookmakers(data_selecionada, ids_bookmakers):
+    """Tabela longa única com as odds de todos os bookmakers informados (coluna bookmaker_id)
+
+    Trocar de bookmaker passa a ser um filtro nesta tabela, sem nova busca na API.
+    Retorna (tabela_odds, atualizacoes), como `buscar_tabela_odds`.
+    """
+    respostas = buscar_odds_varios_bookmakers(data_selecionada, list(ids_bookmakers))
+    tabela_odds = pd.concat([normalizar_odds(respostas[id_bookmaker]) for id_bookmaker in ids_bookmakers],
+                            ignore_index=True)
+    atualizacoes = pd.concat([atualizacoes_por_jogo(respostas[id_bookmaker]) for id_bookmaker in ids_bookmakers],
+                             ignore_index=True)
+    registrar_captura_odds(data_selecionada, tabela_odds)
+    return tabela_odds, atualizacoes
+
+
+def buscar_odds_jogo(id_jogo, id_bookmaker=None):
+    """Busca as odds de um único jogo (de um bookmaker ou de todos). Não usa Streamlit.
+
+    Ignora o cache em disco: quem chama quer justamente a cotação mais recente.
+    Retorna (status_code, dados) - dados é None quando a resposta não é 200.
+    """
+    parametros = {'fixture': id_jogo}
+    if id_bookmaker is not None:
+        parametros['bookmaker'] = id_bookmaker
+    resposta = api_get('/odds', params=parametros, use_cache=False)
+    if resposta.status_code != 200:
+        return resposta.status_code, None
+    return resposta.status_code, resposta.json()
+
+
+def jogos_para_atualizar(dados_jogos, atualizacoes, janela_minutos=None, idade_maxima_minutos=None, agora=None):
+    """IDs dos jogos ainda não iniciados que precisam de odds novas
+
+    Entram os jogos que começam dentro de `janela_minutos` e os que foram verificados
+    há mais de `idade_maxima_minutos`. Jogos sem odds na busca completa contam como
+    verificados no momento dela.
+    """
+    janela = pd.Timedelta(minutes=janela_minutos or settings.odds_refresh_window_minutes)
+    idade_maxima = pd.Timedelta(minutes=idade_maxima_minutos or settings.odds_max_age_minutes)
+    agora = agora or pd.Timestamp.now(tz='UTC')
+
+    inicios = pd.Series({
+        jogo['fixture']['id']: jogo['fixture'].get('timestamp')
+        for jogo in (dados_jogos or {}).get('response', [])
+    }, dtype='float64')
+    inicios = pd.to_datetime(inicios, unit='s', utc=True)
+    inicios = inicios[inicios > agora]
+
+    verificados = atualizacoes.groupby('fixture_id')['verificado_em'].min().reindex(inicios.index)
+    if not atualizacoes.empty:
+        verificados = verificados.fillna(atualizacoes['verificado_em'].max())
+    precisam = (inicios <= agora + janela) | verificados.isna() | (verificados < agora - idade_maxima)
+    return inicios.index[precisam].tolist()
+
+
+def atualizar_odds_incremental(dados_jogos, tabela_odds, atualizacoes, ids_bookmakers, data_selecionada=None,
+                               janela_minutos=None, idade_maxima_minutos=None):
+    """Atualiza só as odds dos jogos que precisam (ver `jogos_para_atualizar`)
+
+    Cada jogo é buscado por `/odds?fixture=` em paralelo (uma chamada por jogo, ou
+    por jogo e bookmaker quando há um só). As linhas de um jogo/bookmaker só são
+    trocadas quando o `update` da resposta é mais novo que o guardado.
+    Retorna (tabela_odds, atualizacoes, jogos_consultados, jogos_alterados).
+    """
+    ids_jogos = jogos_para_atualizar(dados_jogos, atualizacoes, janela_minutos, idade_maxima_minutos)
+    if not ids_jogos:
+        return tabela_odds, atualizacoes, 0, 0
+
+    id_bookmaker_unico = ids_bookmakers[0] if len(ids_bookmakers) == 1 else None
+    respostas = []
+    consultados = []
+    with ThreadPoolExecutor(max_workers=settings.api_max_workers) as executor:
+        futuros = {executor.submit(buscar_odds_jogo, id_jogo, id_bookmaker_unico): id_jogo for id_jogo in ids_jogos}
+        for futuro in as_completed(futuros):
+            try:
+                status_code, dados = futuro.result()
+            except Exception as e:
+                st.warning(f"Erro ao atualizar odds do jogo {futuros[futuro]}: {str(e)}")
+                continue
+            if dados is None:
+                st.warning(f"Erro ao atualizar odds do jogo {futuros[futuro]}: {status_code}")
+                continue
+            respostas.extend(dados.get('response', []))
+            consultados.append(futuros[futuro])
+
+    novas_atualizacoes = atualizacoes_por_jogo({'response': respostas})
+    novas_atualizacoes = novas_atualizacoes[novas_atualizacoes['bookmaker_id'].isin(ids_bookmakers)]
+    novas_odds = normalizar_odds({'response': respostas})
+    novas_odds = novas_odds[novas_odds['bookmaker_id'].isin(ids_bookmakers)]
+
+    # Só trocam as linhas dos pares (jogo, bookmaker) cujo `update` avançou
+    comparacao = novas_atualizacoes.merge(atualizacoes[['fixture_id', 'bookmaker_id', 'atualizado_em']],
+                                          on=['fixture_id', 'bookmaker_id'], how='left',
+                                          suffixes=('', '_anterior'))
+    mudaram = comparacao[comparacao['atualizado_em_anterior'].isna() |
+                         (comparacao['atualizado_em'] > comparacao['atualizado_em_anterior'])]
+    pares_mudaram = pd.MultiIndex.from_frame(mudaram[['fixture_id', 'bookmaker_id']])
+
+    if len(pares_mudaram):
+        pares_tabela = pd.MultiIndex.from_frame(tabela_odds[['fixture_id', 'bookmaker_id']])
+        pares_novas = pd.MultiIndex.from_frame(novas_odds[['fixture_id', 'bookmaker_id']])
+        odds_trocadas = novas_odds[pares_novas.isin(pares_mudaram)]
+        tabela_odds = pd.concat([tabela_odds[~pares_tabela.isin(pares_mudaram)], odds_trocadas], ignore_index=True)
+        tabela_odds['label'] = tabela_odds['label'].astype('category')
+        if data_selecionada:
+            registrar_captura_odds(data_selecionada, odds_trocadas)
+
+    # Pares consultados passam a contar como verificados agora (mudando ou não); jogos que
+    # voltaram sem odds ganham uma linha sem `update` para não serem consultados de novo
+    sem_odds = sorted(set(consultados) - set(novas_atualizacoes['fixture_id']))
+    if sem_odds:
+        quantidade = len(sem_odds) * len(ids_bookmakers)
+        novas_atualizacoes = pd.concat([novas_atualizacoes, pd.DataFrame({
+            'fixture_id': np.repeat(np.array(sem_odds, dtype=np.int64), len(ids_bookmakers)),
+            'bookmaker_id': np.tile(np.array(ids_bookmakers, dtype=np.int16), len(sem_odds)),
+            'atualizado_em': pd.Series([pd.NaT] * quantidade, dtype=novas_atualizacoes['atualizado_em'].dtype),
+            'verificado_em': pd.Timestamp.now(tz='UTC'),
+        })], ignore_index=True)
+
+    pares_consultados = pd.MultiIndex.from_frame(novas_atualizacoes[['fixture_id', 'bookmaker_id']])
+    pares_atualizacoes = pd.MultiIndex.from_frame(atualizacoes[['fixture_id', 'bookmaker_id']])
+    atualizacoes = pd.concat([atualizacoes[~pares_atualizacoes.isin(pares_consultados)], novas_atualizacoes],
+                             ignore_index=True)
+
+    return tabela_odds, atualizacoes, len(ids_jogos), mudaram['fixture_id'].nunique()
+
+
 def buscar_ou_salvar_estatisticas(team_id, league_id, season):
     """Busca estatísticas do banco ou da API e salva se necessário"""
     # Primeiro, verificar se já temos as estatísticas no banco
@@ -257,13 +598,28 @@ def buscar_ou_salvar_estatisticas(team_id, league_id, season):
             'temporada', season).execute()
 
         if resultado.data:
-            # Estatísticas já existem no banco
-            return resultado.data[0]
+            # Estatísticas já existem no banco; se estiverem velhas, atualiza em segundo plano
+            estatisticas = resultado.data[0]
+            chave = (team_id, league_id, season)
+            atualizar_estatisticas_em_segundo_plano(estatisticas_desatualizadas({chave: estatisticas}))
+            return estatisticas
     except Exception as e:
         print(f"Erro ao buscar estatísticas do banco: {str(e)}")
 
     # Se não temos no banco, buscar da API
-    url = f"{URL_BASE}/teams/statistics"
+    return buscar_estatisticas_api(team_id, league_id, season)
+
+
+def buscar_estatisticas_api(team_id, league_id, season):
+    """Busca estatísticas de um time na API, processa e salva no banco"""
+    estatisticas = buscar_estatisticas_api_sem_salvar(team_id, league_id, season)
+    if estatisticas:
+        salvar_estatisticas_em_lote([estatisticas])
+    return estatisticas
+
+
+def buscar_estatisticas_api_sem_salvar(team_id, league_id, season, usar_cache=True):
+    """Busca e processa estatísticas da API sem gravar no banco (seguro para threads)"""
     parametros = {
         'team': team_id,
         'league': league_id,
@@ -271,23 +627,164 @@ def buscar_ou_salvar_estatisticas(team_id, league_id, season):
     }
 
     try:
-        resposta = requests.get(url, headers=cabecalhos, params=parametros)
+        resposta = api_get('/teams/statistics', params=parametros, use_cache=usar_cache)
         if resposta.status_code == 200:
             dados = resposta.json()
             if dados.get('response'):
-                stats_api = dados['response']
-
-                # Processar e salvar no banco
-                estatisticas = processar_e_salvar_estatisticas(team_id, league_id, season, stats_api)
-                return estatisticas
+                return processar_estatisticas(team_id, league_id, season, dados['response'])
     except Exception as e:
         print(f"Erro ao buscar estatísticas da API: {str(e)}")
 
     return None
 
 
-def processar_e_salvar_estatisticas(team_id, league_id, season, stats_api):
-    """Processa estatísticas da API e salva no banco"""
+def buscar_estatisticas_api_em_paralelo(triplas, ao_progredir=None, usar_cache=True):
+    """Busca na API as estatísticas de várias triplas com um pool limitado de threads
+
+    O ritmo fica por conta do rate limiter de api_get. As linhas obtidas são gravadas
+    no banco com upserts em lote ao final. `ao_progredir(concluidas, total)` é chamado
+    na thread principal a cada resposta, para a UI acompanhar o andamento.
+    """
+    estatisticas = {}
+    total = len(triplas)
+    if not total:
+        return estatisticas
+
+    with ThreadPoolExecutor(max_workers=settings.api_max_workers) as executor:
+        futuros = {
+            executor.submit(buscar_estatisticas_api_sem_salvar, *tripla, usar_cache): tripla
+            for tripla in triplas
+        }
+        for concluidas, futuro in enumerate(as_completed(futuros), start=1):
+            stats = futuro.result()
+            if stats:
+                estatisticas[futuros[futuro]] = stats
+            if ao_progredir:
+                ao_progredir(concluidas, total)
+
+    salvar_estatisticas_em_lote(list(estatisticas.values()))
+    return estatisticas
+
+
+def estatisticas_desatualizadas(estatisticas):
+    """Identifica quais linhas de estatisticas_times estão velhas
+
+    Recebe {(time_id, liga_id, temporada): linha} e devolve o conjunto de chaves cuja
+    `data_referencia` é mais antiga que `STATS_MAX_AGE_DAYS` ou anterior ao último jogo
+    encerrado do time naquela liga/temporada registrado na tabela `jogos`.
+    """
+    desatualizadas = set()
+    if not estatisticas:
+        return desatualizadas
+
+    limite_idade = date.today() - timedelta(days=settings.stats_max_age_days)
+    referencias = {}
+    for chave, linha in estatisticas.items():
+        try:
+            data_referencia = date.fromisoformat(str(linha.get('data_referencia'))[:10])
+        except (TypeError, ValueError):
+            desatualizadas.add(chave)
+            continue
+        if data_referencia < limite_idade:
+            desatualizadas.add(chave)
+        else:
+            referencias[chave] = data_referencia
+
+    if not referencias:
+        return desatualizadas
+
+    # Último jogo encerrado de cada time (como mandante ou visitante) depois da referência mais antiga
+    times = sorted({time_id for time_id, _, _ in referencias})
+    ligas = sorted({liga_id for _, liga_id, _ in referencias})
+    data_minima = min(referencias.values()).isoformat()
+    ultimo_jogo = {}
+    for coluna_time in ['time_casa_id', 'time_fora_id']:
+        try:
+            resultado = supabase.table('jogos').select(f"{coluna_time}, liga_id, temporada, data") \
+                .in_(coluna_time, times) \
+                .in_('liga_id', ligas) \
+                .in_('status', STATUS_FINALIZADOS) \
+                .gt('data', data_minima) \
+                .execute()
+        except Exception as e:
+            print(f"Erro ao buscar últimos jogos encerrados: {str(e)}")
+            continue
+        for jogo in resultado.data:
+            chave = (jogo[coluna_time], jogo['liga_id'], jogo['temporada'])
+            data_jogo = date.fromisoformat(str(jogo['data'])[:10])
+            if chave not in ultimo_jogo or data_jogo > ultimo_jogo[chave]:
+                ultimo_jogo[chave] = data_jogo
+
+    for chave, data_referencia in referencias.items():
+        if chave in ultimo_jogo and ultimo_jogo[chave] > data_referencia:
+            desatualizadas.add(chave)
+
+    return desatualizadas
+
+
+def atualizar_estatisticas_em_segundo_plano(triplas):
+    """Atualiza as triplas informadas numa thread separada (stale-while-revalidate)
+
+    Quem chamou continua usando o valor antigo; a nova versão vai para o banco e
+    aparece na próxima consulta. Triplas que já estão sendo atualizadas são ignoradas.
+    """
+    with trava_atualizacoes:
+        novas = set(triplas) - atualizacoes_em_andamento
+        atualizacoes_em_andamento.update(novas)
+    if not novas:
+        return None
+
+    def atualizar():
+        try:
+            # Sem cache em disco: a resposta cacheada seria tão velha quanto a linha do banco
+            buscar_estatisticas_api_em_paralelo(sorted(novas), usar_cache=False)
+        except Exception as e:
+            print(f"Erro ao atualizar estatísticas em segundo plano: {str(e)}")
+        finally:
+            with trava_atualizacoes:
+                atualizacoes_em_andamento.difference_update(novas)
+
+    thread = threading.Thread(target=atualizar, name="atualizacao-estatisticas", daemon=True)
+    thread.start()
+    return thread
+
+
+def buscar_estatisticas_banco_em_lote(triplas, tamanho_lote=200):
+    """Busca no banco as estatísticas de várias triplas (time_id, liga_id, temporada) de uma vez
+
+    Usa filtros `in_` por time, liga e temporada (em lotes de `tamanho_lote` times para
+    não estourar o tamanho da URL) e descarta as combinações que não foram pedidas.
+    Retorna um dict {(time_id, liga_id, temporada): linha}.
+    """
+    encontradas = {}
+    if not triplas:
+        return encontradas
+
+    ligas = sorted({liga_id for _, liga_id, _ in triplas})
+    temporadas = sorted({temporada for _, _, temporada in triplas})
+    times = sorted({time_id for time_id, _, _ in triplas})
+
+    for inicio in range(0, len(times), tamanho_lote):
+        try:
+            resultado = supabase.table('estatisticas_times').select("*") \
+                .in_('time_id', times[inicio:inicio + tamanho_lote]) \
+                .in_('liga_id', ligas) \
+                .in_('temporada', temporadas) \
+                .execute()
+        except Exception as e:
+            print(f"Erro ao buscar estatísticas do banco em lote: {str(e)}")
+            continue
+
+        for linha in resultado.data:
+            chave = (linha['time_id'], linha['liga_id'], linha['temporada'])
+            if chave in triplas:
+                encontradas[chave] = linha
+
+    return encontradas
+
+
+def processar_estatisticas(team_id, league_id, season, stats_api):
+    """Converte o payload de /teams/statistics no formato da tabela estatisticas_times"""
     try:
         fixtures = stats_api.get('fixtures', {})
         goals = stats_api.get('goals', {})
@@ -345,9 +842,6 @@ def processar_e_salvar_estatisticas(team_id, league_id, season, stats_api):
             'atualizado_em': datetime.now().isoformat()
         }
 
-        # Salvar no banco
-        supabase.table('estatisticas_times').upsert(dados_estatisticas).execute()
-
         return dados_estatisticas
 
     except Exception as e:
@@ -355,20 +849,31 @@ def processar_e_salvar_estatisticas(team_id, league_id, season, stats_api):
         return None
 
 
+def salvar_estatisticas_em_lote(lista_estatisticas, tamanho_lote=200):
+    """Faz upsert de várias linhas de estatisticas_times em lotes"""
+    salvas = 0
+    for inicio in range(0, len(lista_estatisticas), tamanho_lote):
+        lote = lista_estatisticas[inicio:inicio + tamanho_lote]
+        try:
+            supabase.table('estatisticas_times').upsert(lote, on_conflict='time_id,liga_id,temporada').execute()
+            salvas += len(lote)
+        except Exception as e:
+            print(f"Erro ao salvar lote de estatísticas: {str(e)}")
+    return salvas
+
+
 @st.cache_data(ttl=1800)  # Cache por 30 minutos (estatísticas mudam menos)
 def buscar_estatisticas_por_liga(league_id, season):
     """Busca estatísticas de todos os times de uma liga específica"""
-    url = f"{URL_BASE}/teams/statistics"
     estatisticas_liga = {}
 
-    url_teams = f"{URL_BASE}/teams"
     parametros_teams = {
         'league': league_id,
         'season': season
     }
 
     try:
-        resposta_teams = requests.get(url_teams, headers=cabecalhos, params=parametros_teams)
+        resposta_teams = api_get('/teams', params=parametros_teams)
         if resposta_teams.status_code != 200:
             st.warning(f"Erro ao buscar teams da liga {league_id}: {resposta_teams.status_code}")
             return estatisticas_liga
@@ -379,29 +884,56 @@ def buscar_estatisticas_por_liga(league_id, season):
         if not teams:
             return estatisticas_liga
 
-        total_teams = len(teams)
-        progress_placeholder = st.empty()
+        triplas = {(team_data['team']['id'], league_id, season) for team_data in teams}
+        for (team_id, _, _), stats in buscar_estatisticas_times(triplas).items():
+            estatisticas_liga[team_id] = stats
+
+        return estatisticas_liga
 
-        for idx, team_data in enumerate(teams):
-            team_id = team_data['team']['id']
-            team_name = team_data['team']['name']
+    except Exception as e:
+        st.warning(f"Erro ao buscar times da liga {league_id}: {str(e)}")
+        return estatisticas_liga
 
-            progress_placeholder.info(f"📊 Carregando estatísticas da liga: {idx + 1}/{total_teams} times")
 
-            # Tentar buscar do banco primeiro
-            stats = buscar_ou_salvar_estatisticas(team_id, league_id, season)
-            if stats:
-                estatisticas_liga[team_id] = stats
+def triplas_dos_jogos(df_jogos):
+    """Conjunto de (time_id, liga_id, temporada) dos times da casa e de fora dos jogos"""
+    triplas = set()
+    for coluna_time in ['team_home_id', 'team_away_id']:
+        triplas.update(
+            (int(team_id), int(league_id), int(season))
+            for team_id, league_id, season in zip(df_jogos[coluna_time], df_jogos['league_id'], df_jogos['season'])
+        )
+    return triplas
 
-            time.sleep(0.05)
 
-        progress_placeholder.empty()
+def buscar_estatisticas_times(triplas, desatualizadas=None):
+    """Busca estatísticas apenas das triplas (time_id, liga_id, temporada) informadas
 
-        return estatisticas_liga
+    Tudo o que já está no banco vem de uma consulta em lote (linhas velhas são
+    devolvidas assim mesmo e atualizadas em segundo plano); a API só é chamada,
+    em paralelo, para as triplas que faltam. Se `desatualizadas` for um set, recebe
+    as triplas devolvidas com linha velha.
+    """
+    triplas = set(triplas)
+    estatisticas = buscar_estatisticas_banco_em_lote(triplas)
+    velhas = estatisticas_desatualizadas(estatisticas)
+    if desatualizadas is not None:
+        desatualizadas.update(velhas)
+    atualizar_estatisticas_em_segundo_plano(velhas)
+    faltantes = sorted(triplas - estatisticas.keys())
+    if not faltantes:
+        return estatisticas
 
-    except Exception as e:
-        st.warning(f"Erro ao buscar times da liga {league_id}: {str(e)}")
-        return estatisticas_liga
+    barra_progresso = st.progress(0.0, text=f"📊 Buscando estatísticas na API: 0/{len(faltantes)} times")
+
+    def ao_progredir(concluidas, total):
+        barra_progresso.progress(concluidas / total,
+                                 text=f"📊 Buscando estatísticas na API: {concluidas}/{total} times")
+
+    estatisticas.update(buscar_estatisticas_api_em_paralelo(faltantes, ao_progredir))
+    barra_progresso.empty()
+
+    return estatisticas
 
 
 def extrair_estatisticas_time(stats_data):
@@ -469,129 +1001,46 @@ def converter_para_horario_brasilia(data_utc_str):
         return data_utc_str
 
 
-def extrair_melhor_odd_gols(valores):
-    """Extrai a melhor odd de gols disponível (Over 0.5, 1.0, 1.5, etc.)"""
-    opcoes_over = ['Over 0.5', 'Over 1.0', 'Over 1.5', 'Over 2.0', 'Over 2.5']
-
-    for opcao in opcoes_over:
-        for valor in valores:
-            valor_str = str(valor.get('value', ''))
-            if opcao in valor_str:
-                legenda = f"Mais de {opcao.split(' ')[1]}"
-                return valor.get('odd'), legenda
-    return None, None
-
-
-def extrair_odds_por_id(dados_odds, id_aposta_desejado):
-    """Extrai odds específicas por ID da aposta"""
-    odds_extraidas = {}
-
-    if not dados_odds or 'bookmakers' not in dados_odds:
-        return odds_extraidas
-
-    casas_apostas = dados_odds['bookmakers']
-    if not casas_apostas:
-        return odds_extraidas
-
-    apostas = casas_apostas[0]['bets']
-
-    for aposta in apostas:
-        if aposta.get('id') == id_aposta_desejado:
-            valores = aposta.get('values', [])
-
-            if id_aposta_desejado == 1:  # Match Winner
-                for valor in valores:
-                    if valor.get('value') == 'Home':
-                        odds_extraidas['casa'] = valor.get('odd')
-                    elif valor.get('value') == 'Draw':
-                        odds_extraidas['empate'] = valor.get('odd')
-                    elif valor.get('value') == 'Away':
-                        odds_extraidas['fora'] = valor.get('odd')
-
-            elif id_aposta_desejado == 16:  # Home Team Goals
-                odd, legenda = extrair_melhor_odd_gols(valores)
-                if odd:
-                    odds_extraidas['gols_casa'] = odd
-                    odds_extraidas['legenda_casa'] = legenda
-
-            elif id_aposta_desejado == 17:  # Away Team Goals
-                odd, legenda = extrair_melhor_odd_gols(valores)
-                if odd:
-                    odds_extraidas['gols_fora'] = odd
-                    odds_extraidas['legenda_fora'] = legenda
-            break
-    return odds_extraidas
-
-def identificar_criterio_selecao(row):
+def aplicar_criterios_selecao(df, tabela_odds, regras=None, id_bookmaker=None):
     """
-    Identifica qual critério foi usado para seleção automática
-    Retorna:
-    - 'Resultado/Gol' para critérios 1 e 2 (vitória + gol adversário)
-    - 'Gols' para critério 3 (ambos marcam)
-    - None se não atende nenhum critério
+    Preenche 'criterio_selecao' e 'selecao_automatica' avaliando as regras de
+    seleção (padrão: arquivo SELECTION_RULES_FILE) sobre a tabela longa de odds.
+    Cada jogo recebe o nome da regra de maior prioridade que atende, ou ''.
+    Com `id_bookmaker`, só as odds desse bookmaker são consideradas.
     """
-    try:
-        odd_casa = row.get('odd_casa')
-        odd_fora = row.get('odd_fora')
-        odd_gols_casa = row.get('odd_gols_casa')
-        odd_gols_fora = row.get('odd_gols_fora')
-        legenda_gols_casa = row.get('legenda_gols_casa')
-        legenda_gols_fora = row.get('legenda_gols_fora')
-
-        # Condição 1: Casa vence (>= 1.5) E Fora marca (over 0.5 >= 1.5)
-        condicao1 = False
-        if odd_casa and odd_gols_fora and legenda_gols_fora:
-            if float(odd_casa) >= 1.5 and "0.5" in legenda_gols_fora and float(odd_gols_fora) >= 1.5:
-                condicao1 = True
-
-        # Condição 2: Fora vence (>= 1.5) E Casa marca (over 0.5 >= 1.5)
-        condicao2 = False
-        if odd_fora and odd_gols_casa and legenda_gols_casa:
-            if float(odd_fora) >= 1.5 and "0.5" in legenda_gols_casa and float(odd_gols_casa) >= 1.5:
-                condicao2 = True
-
-        # Condição 3: Casa marca (over 0.5 >= 1.5) E Fora marca (over 0.5 >= 1.5)
-        condicao3 = False
-        if odd_gols_casa and odd_gols_fora and legenda_gols_casa and legenda_gols_fora:
-            casa_marca = "0.5" in legenda_gols_casa and float(odd_gols_casa) >= 1.5
-            fora_marca = "0.5" in legenda_gols_fora and float(odd_gols_fora) >= 1.5
-            if casa_marca and fora_marca:
-                condicao3 = True
-
-        # Prioridade: Critério 3 (mais específico) > Critérios 1 e 2
-        if condicao3:
-            return 'Gols'
-        elif condicao1 or condicao2:
-            return 'Resultado/Gol'
-        else:
-            return None
+    regras = regras or regras_padrao()
+    criterios = regras.avaliar(tabela_odds, id_bookmaker)
+    df['criterio_selecao'] = df['id_jogo'].map(criterios).fillna('')
+    df['selecao_automatica'] = df['criterio_selecao'] != ''
+    return df
 
-    except (ValueError, TypeError):
-        return None
 
-def verificar_selecao_automatica(row):
-    """
-    ATUALIZADO: Verifica se uma linha deve ser selecionada automaticamente
-    Usa a função identificar_criterio_selecao para determinar se há critério atendido
-    """
-    criterio = identificar_criterio_selecao(row)
-    return criterio is not None
+@st.cache_resource
+def regras_padrao():
+    """Regras de seleção do arquivo de configuração, compiladas uma única vez"""
+    return carregar_regras()
+
 
+def processar_dados_jogos_e_odds(dados_jogos, tabela_odds, liga_selecionada=None, filtrar_sem_odds_gols=False, regras=None,
+                                 id_bookmaker=None):
+    """Processa e combina dados dos jogos com suas odds (SEM estatísticas inicialmente)
 
-def processar_dados_jogos_e_odds(dados_jogos, dados_odds, liga_selecionada=None, filtrar_sem_odds_gols=False):
-    """Processa e combina dados dos jogos com suas odds (SEM estatísticas inicialmente)"""
+    `tabela_odds` é a tabela longa de `normalizar_odds` (a resposta crua de /odds
+    também é aceita e normalizada aqui). `regras` substitui as regras de seleção
+    do arquivo de configuração. Se a tabela tiver vários bookmakers, `id_bookmaker`
+    escolhe o das colunas de odds e dos critérios, e as colunas `melhor_*` trazem o
+    melhor preço de cada mercado e o bookmaker que o oferece.
+    """
     if not dados_jogos or 'response' not in dados_jogos:
         return pd.DataFrame()
 
-    if not dados_odds or 'response' not in dados_odds:
+    if isinstance(tabela_odds, dict):
+        tabela_odds = normalizar_odds(tabela_odds)
+
+    if tabela_odds is None or tabela_odds.empty:
         # Removendo st.warning aqui para que a UI em app_odds_streamlit.py gerencie
         return pd.DataFrame()
 
-    mapa_odds = {}
-    for odd_item in dados_odds['response']:
-        fixture_id = odd_item['fixture']['id']
-        mapa_odds[fixture_id] = odd_item
-
     lista_jogos = []
 
     for jogo in dados_jogos['response']:
@@ -605,7 +1054,7 @@ def processar_dados_jogos_e_odds(dados_jogos, dados_odds, liga_selecionada=None,
             id_jogo = jogo['fixture']['id']
             horario_formatado = converter_para_horario_brasilia(jogo['fixture']['date'])
 
-            info_jogo = {
+            lista_jogos.append({
                 'id_jogo': id_jogo,
                 'liga': nome_liga,
                 'país': pais,
@@ -618,122 +1067,151 @@ def processar_dados_jogos_e_odds(dados_jogos, dados_odds, liga_selecionada=None,
                 'time_fora': jogo['teams']['away']['name'],
                 'time_casa_logo': jogo['teams']['home']['logo'],
                 'time_fora_logo': jogo['teams']['away']['logo'],
-                'status': jogo['fixture']['status']['long'],
-                'odd_casa': None,
-                'odd_empate': None,
-                'odd_fora': None,
-                'odd_gols_casa': None,
-                'legenda_gols_casa': None,
-                'odd_gols_fora': None,
-                'legenda_gols_fora': None
-            }
+                'status': jogo['fixture']['status']['long']
+            })
 
-            if id_jogo in mapa_odds:
-                dados_odds_jogo = mapa_odds[id_jogo]
+        except Exception as e:
+            st.warning(f"Erro ao processar jogo {jogo.get('fixture', {}).get('id', 'desconhecido')}: {str(e)}")
+            continue
 
-                odds_resultado = extrair_odds_por_id(dados_odds_jogo, 1)
-                info_jogo.update({
-                    'odd_casa': odds_resultado.get('casa'),
-                    'odd_empate': odds_resultado.get('empate'),
-                    'odd_fora': odds_resultado.get('fora')
-                })
+    df = pd.DataFrame(lista_jogos)
+    if df.empty:
+        return df
 
-                # info_jogo.update(odds_resultado) # Adiciona odd_casa, odd_empate, odd_fora
+    # Odds de cada jogo (resultado e gols) vêm prontas da tabela longa
+    df = df.join(odds_principais_por_jogo(tabela_odds, id_bookmaker), on='id_jogo')
+    if tabela_odds['bookmaker_id'].nunique() > 1:
+        df = df.join(melhores_odds_por_jogo(tabela_odds), on='id_jogo')
 
-                odds_gols_casa = extrair_odds_por_id(dados_odds_jogo, 16)
-                info_jogo['odd_gols_casa'] = odds_gols_casa.get('gols_casa')
-                info_jogo['legenda_gols_casa'] = odds_gols_casa.get('legenda_casa')
+    if filtrar_sem_odds_gols:
+        df = df[df['odd_gols_casa'].notna() & df['odd_gols_fora'].notna()].reset_index(drop=True)
 
-                odds_gols_fora = extrair_odds_por_id(dados_odds_jogo, 17)
-                info_jogo['odd_gols_fora'] = odds_gols_fora.get('gols_fora')
-                info_jogo['legenda_gols_fora'] = odds_gols_fora.get('legenda_fora')
+    return aplicar_criterios_selecao(df, tabela_odds, regras, id_bookmaker)
 
-            if filtrar_sem_odds_gols:
-                if not (info_jogo['odd_gols_casa'] and info_jogo['odd_gols_fora']):
-                    continue
 
-            criterio_usado = identificar_criterio_selecao(info_jogo)
-            info_jogo['criterio_selecao'] = criterio_usado if criterio_usado else ''
-            info_jogo['selecao_automatica'] = verificar_selecao_automatica(info_jogo)
+def buscar_estatisticas_para_jogos_selecionados(df_jogos_original, jogos_selecionados, preaquecer_ligas=False):
+    """Busca e adiciona estatísticas aos jogos selecionados no DataFrame original.
 
-            lista_jogos.append(info_jogo)
+    Só os times dos jogos selecionados são consultados; `preaquecer_ligas=True`
+    carrega a liga inteira de cada jogo (útil para aquecer o cache de estatísticas).
+    As estatísticas são memorizadas por tripla e a junção aos jogos é feita à parte.
+    """
+    # Identificar as triplas (time, liga, temporada) realmente envolvidas na seleção
+    df_selecionados = df_jogos_original[df_jogos_original['id_jogo'].isin(jogos_selecionados)]
+    triplas = frozenset(triplas_dos_jogos(df_selecionados))
 
-        except Exception as e:
-            st.warning(f"Erro ao processar jogo {jogo.get('fixture', {}).get('id', 'desconhecido')}: {str(e)}")
-            continue
+    if triplas:
+        st.info(
+            f"🔄 Carregando estatísticas de {len(triplas)} time(s) para {len(jogos_selecionados)} jogo(s) selecionado(s)...")
 
-    return pd.DataFrame(lista_jogos)
+    return juntar_estatisticas_jogos(df_jogos_original, tabela_estatisticas_triplas(triplas, preaquecer_ligas),
+                                     jogos_selecionados)
 
 
-@st.cache_data(ttl=3600)  # Cache mais longo para estatísticas
-def buscar_estatisticas_para_jogos_selecionados(df_jogos_original, jogos_selecionados):
-    """Busca e adiciona estatísticas aos jogos selecionados no DataFrame original."""
-    if not jogos_selecionados:
-        return df_jogos_original.assign(
-            jogos='N/A', vitorias='N/A', derrotas='N/A',
-            gols_marcados='N/A', gols_sofridos='N/A', jogos_sem_marcar='N/A'
-        )
+def tabela_estatisticas_triplas(triplas, preaquecer_ligas=False):
+    """Tabela de estatísticas das triplas (a ordem da seleção não importa)"""
+    return buscar_tabela_estatisticas(tuple(sorted(frozenset(triplas))), preaquecer_ligas)
+
+
+def estatisticas_memorizadas_validas(triplas, agora):
+    """Estatísticas memorizadas das triplas ainda dentro do TTL (as vencidas são descartadas)"""
+    with trava_estatisticas_memorizadas:
+        while estatisticas_memorizadas:
+            momento, _ = next(iter(estatisticas_memorizadas.values()))
+            if agora - momento < TTL_ESTATISTICAS_MEMORIZADAS:
+                break
+            estatisticas_memorizadas.popitem(last=False)
+        return {tripla: estatisticas_memorizadas[tripla][1] for tripla in triplas
+                if tripla in estatisticas_memorizadas}
+
+
+def memorizar_estatisticas(estatisticas, agora):
+    """Memoriza as estatísticas por tripla, mantendo no máximo MAX_ESTATISTICAS_MEMORIZADAS"""
+    with trava_estatisticas_memorizadas:
+        for tripla, stats in estatisticas.items():
+            estatisticas_memorizadas[tripla] = (agora, stats)
+            estatisticas_memorizadas.move_to_end(tripla)
+        while len(estatisticas_memorizadas) > MAX_ESTATISTICAS_MEMORIZADAS:
+            estatisticas_memorizadas.popitem(last=False)
+
+
+def buscar_tabela_estatisticas(triplas_ordenadas, preaquecer_ligas=False):
+    """Busca as estatísticas das triplas, reaproveitando as já memorizadas por tripla
+
+    Triplas com linha velha no banco (atualizadas em segundo plano) não são
+    memorizadas, para a versão nova aparecer na próxima busca.
+    """
+    triplas = set(triplas_ordenadas)
+    agora = datetime.now()
 
+    cache_estatisticas = estatisticas_memorizadas_validas(triplas, agora)
 
-    # Criar uma cópia do DataFrame original para modificação
-    df_com_stats = df_jogos_original.copy()
+    buscadas = {}
+    desatualizadas = set()
+    faltantes = triplas - cache_estatisticas.keys()
+    if faltantes and preaquecer_ligas:
+        # Caminho antigo: carrega todos os times das ligas envolvidas (gasta 1 + N chamadas por liga)
+        for league_id, season in sorted({(liga, temporada) for _, liga, temporada in faltantes}):
+            with st.spinner(f"Carregando estatísticas da liga {league_id} (Temporada {season})"):
+                for team_id, stats in buscar_estatisticas_por_liga(league_id, season).items():
+                    buscadas[(team_id, league_id, season)] = stats
+        # O resultado por liga é cacheado: valem as triplas que ainda estão sendo atualizadas
+        with trava_atualizacoes:
+            desatualizadas.update(atualizacoes_em_andamento & buscadas.keys())
+
+    faltantes -= buscadas.keys()
+    if faltantes:
+        with st.spinner(f"Carregando estatísticas de {len(faltantes)} time(s)"):
+            buscadas.update(buscar_estatisticas_times(faltantes, desatualizadas))
+
+    memorizar_estatisticas({tripla: stats for tripla, stats in buscadas.items()
+                            if stats and tripla not in desatualizadas}, agora)
+    cache_estatisticas.update(buscadas)
+
+    return tabela_estatisticas(cache_estatisticas, triplas_ordenadas)
+
+
+def tabela_estatisticas(cache_estatisticas, triplas):
+    """Uma linha por tripla (time_id, liga_id, temporada) com as estatísticas numéricas do time
+
+    Triplas sem estatísticas entram zeradas, como em `extrair_estatisticas_time`.
+    """
+    linhas = []
+    for tripla in triplas:
+        formatadas = extrair_estatisticas_time(cache_estatisticas.get(tripla))
+        linhas.append((*tripla, *(formatadas[coluna] for coluna in COLUNAS_ESTATISTICAS)))
+
+    return pd.DataFrame(linhas, columns=['time_id', 'liga_id', 'temporada'] + COLUNAS_ESTATISTICAS)
+
+
+def juntar_estatisticas_jogos(df_jogos, tabela_stats, jogos_selecionados):
+    """Junta as estatísticas da casa e de fora aos jogos com dois joins vetorizados
+
+    Cada estatística ganha colunas numéricas `<coluna>_casa`/`<coluna>_fora` (para
+    ordenação e exportação) e a coluna de texto "casa - fora" exibida na tabela.
+    Jogos não selecionados ficam com 'N/A' no texto e <NA> nas numéricas.
+    """
+    selecionados = df_jogos['id_jogo'].isin(jogos_selecionados)
+    stats_por_tripla = tabela_stats.set_index(['time_id', 'liga_id', 'temporada'])
+
+    colunas_antigas = [coluna for coluna in COLUNAS_ESTATISTICAS if coluna in df_jogos.columns]
+    colunas_antigas += [f'{coluna}_{lado}' for coluna in COLUNAS_ESTATISTICAS for lado in ('casa', 'fora')
+                        if f'{coluna}_{lado}' in df_jogos.columns]
+    df_com_stats = df_jogos.drop(columns=colunas_antigas)
+
+    for lado, coluna_time in (('casa', 'team_home_id'), ('fora', 'team_away_id')):
+        df_com_stats = df_com_stats.join(stats_por_tripla.add_suffix(f'_{lado}'),
+                                         on=[coluna_time, 'league_id', 'season'])
+
+    novas_colunas = {}
+    for coluna in COLUNAS_ESTATISTICAS:
+        casa = df_com_stats[f'{coluna}_casa'].fillna(0).astype('Int64').where(selecionados)
+        fora = df_com_stats[f'{coluna}_fora'].fillna(0).astype('Int64').where(selecionados)
+        novas_colunas[f'{coluna}_casa'] = casa
+        novas_colunas[f'{coluna}_fora'] = fora
+        novas_colunas[coluna] = (casa.astype(str) + ' - ' + fora.astype(str)).where(selecionados, 'N/A')
 
     if 'criterio_selecao' not in df_com_stats.columns:
-        df_com_stats['criterio_selecao'] = ''
-
-    # Garantir que as colunas de estatísticas existam, inicializando com N/A
-    for col in ['jogos', 'vitorias', 'derrotas', 'gols_marcados', 'gols_sofridos', 'jogos_sem_marcar']:
-        if col not in df_com_stats.columns:
-            df_com_stats[col] = 'N/A'
-
-    # Identificar ligas únicas dos jogos selecionados
-    ligas_para_buscar = {}
-    for _, jogo in df_jogos_original[df_jogos_original['id_jogo'].isin(jogos_selecionados)].iterrows():
-        league_id = jogo['league_id']
-        season = jogo['season']
-        nome_liga = jogo['liga']
-
-        if league_id not in ligas_para_buscar:
-            ligas_para_buscar[league_id] = {'nome': nome_liga, 'season': season}
-
-    st.info(
-        f"🔄 Carregando estatísticas de {len(ligas_para_buscar)} liga(s) para {len(jogos_selecionados)} jogo(s) selecionado(s)...")
-
-    cache_estatisticas = {}
-    for league_id, info_liga in ligas_para_buscar.items():
-        season = info_liga['season']
-        nome_liga = info_liga['nome']
-        with st.spinner(f"Carregando estatísticas da liga: {nome_liga} (Temporada {season})"):
-            estatisticas_liga = buscar_estatisticas_por_liga(league_id, season)
-            cache_estatisticas.update(estatisticas_liga)
-        time.sleep(0.1)
-
-    for index, row in df_com_stats.iterrows():
-        if row['id_jogo'] in jogos_selecionados:
-            team_home_id = row['team_home_id']
-            team_away_id = row['team_away_id']
-
-            stats_home = cache_estatisticas.get(team_home_id)
-            stats_home_formatted = extrair_estatisticas_time(stats_home)
-
-            stats_away = cache_estatisticas.get(team_away_id)
-            stats_away_formatted = extrair_estatisticas_time(stats_away)
-
-            df_com_stats.loc[index, 'jogos'] = f"{stats_home_formatted['jogos']} - {stats_away_formatted['jogos']}"
-            df_com_stats.loc[
-                index, 'vitorias'] = f"{stats_home_formatted['vitorias']} - {stats_away_formatted['vitorias']}"
-            df_com_stats.loc[
-                index, 'derrotas'] = f"{stats_home_formatted['derrotas']} - {stats_away_formatted['derrotas']}"
-            df_com_stats.loc[
-                index, 'gols_marcados'] = f"{stats_home_formatted['gols_marcados']} - {stats_away_formatted['gols_marcados']}"
-            df_com_stats.loc[
-                index, 'gols_sofridos'] = f"{stats_home_formatted['gols_sofridos']} - {stats_away_formatted['gols_sofridos']}"
-            df_com_stats.loc[
-                index, 'jogos_sem_marcar'] = f"{stats_home_formatted['jogos_sem_marcar']} - {stats_away_formatted['jogos_sem_marcar']}"
-        else:
-            # Para jogos NÃO selecionados, garantir que as colunas de estatísticas sejam 'N/A'
-            df_com_stats.loc[index, ['jogos', 'vitorias', 'derrotas',
-                                     'gols_marcados', 'gols_sofridos',
-                                     'jogos_sem_marcar']] = 'N/A'
+        novas_colunas['criterio_selecao'] = ''
 
-    return df_com_stats
\ No newline at end of file
+    return df_com_stats.assign(**novas_colunas)
\ No newline at end of file
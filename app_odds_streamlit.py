@@ -4,20 +4,32 @@ from datetime import datetime, date
 import pytz
 import io
 import xlsxwriter
+from functools import partial
 
 
 # Importe apenas as funções necessárias do app.py
 from app import (
     buscar_jogos_por_data,
-    buscar_todas_odds_por_data_e_bookmaker,
+    buscar_tabela_odds,
+    buscar_tabela_odds_varios_bookmakers,
     processar_dados_jogos_e_odds,
+    atualizar_odds_incremental,
+    aplicar_criterios_selecao,
+    regras_padrao,
     buscar_estatisticas_para_jogos_selecionados,
     buscar_ou_salvar_estatisticas,
+    COLUNAS_ESTATISTICAS,
+    estatisticas_memorizadas,
     BOOKMAKERS
 )
 
 # Importar configuração do banco
 from config.database import supabase
+from config.api_cache import api_cache
+from config.settings import settings
+from regras_selecao import regras_de_texto
+from historico_odds import historico_odds
+from tabela_odds import ID_APOSTA_RESULTADO, atualizacoes_por_jogo
 
 # Configuração da página (DEVE SER A PRIMEIRA CHAMADA STREAMLIT)
 st.set_page_config(
@@ -208,13 +220,19 @@ setInterval(applyTableColors, 500);
 # Fuso horário de Brasília
 TIMEZONE_BRASILIA = pytz.timezone('America/Sao_Paulo')
 
+# Conjuntos processados (data, bookmaker, filtro) guardados na sessão e por quanto tempo são reaproveitados
+MAX_CONJUNTOS_PROCESSADOS = 4
+TTL_CONJUNTO_PROCESSADO = 300
+
 # Inicializar controles no session_state
 if 'dados_carregados' not in st.session_state:
     st.session_state.dados_carregados = False
 if 'dados_jogos' not in st.session_state:
     st.session_state.dados_jogos = None
-if 'dados_odds' not in st.session_state:
-    st.session_state.dados_odds = None
+if 'tabela_odds' not in st.session_state:
+    st.session_state.tabela_odds = None
+if 'atualizacoes_odds' not in st.session_state:
+    st.session_state.atualizacoes_odds = None
 if 'df_processado' not in st.session_state:
     st.session_state.df_processado = pd.DataFrame()
 if 'jogos_selecionados' not in st.session_state:
@@ -227,28 +245,144 @@ if 'comparacao_modal' not in st.session_state:
     st.session_state.comparacao_modal = None
 if 'selecoes_manuais' not in st.session_state:
     st.session_state.selecoes_manuais = set()
+if 'conjuntos_processados' not in st.session_state:
+    st.session_state.conjuntos_processados = {}
+if 'chave_conjunto' not in st.session_state:
+    st.session_state.chave_conjunto = None
+if 'regras_selecao' not in st.session_state:
+    st.session_state.regras_selecao = regras_padrao()
 
 
-def safe_format_odd(odd_value):
-    """Formata odds de forma segura"""
-    try:
-        if pd.isna(odd_value) or odd_value is None or odd_value == '':
-            return "N/A"
+def guardar_conjunto_processado(chave, dados_jogos, tabela_odds, df, atualizacoes_odds=None, criado_em=None):
+    """Memoriza na sessão o DataFrame pronto para exibição de (data, bookmaker, filtro)
 
-        # Converter para float se necessário
-        if isinstance(odd_value, str):
-            odd_value = float(odd_value)
+    Junto vão a lista de ligas e as posições das linhas de cada liga, para que o
+    filtro por liga não precise varrer nem copiar o DataFrame a cada rerun.
+    Sem `atualizacoes_odds`, mantém as do conjunto anterior com a mesma chave (ou as da sessão).
+    Ao reaproveitar um conjunto, `criado_em` mantém o momento original para o TTL não ser renovado.
+    """
+    conjuntos = st.session_state.conjuntos_processados
+    anterior = conjuntos.pop(chave, None)
+    if atualizacoes_odds is None:
+        atualizacoes_odds = anterior['atualizacoes_odds'] if anterior else st.session_state.atualizacoes_odds
+    conjuntos[chave] = {
+        'criado_em': criado_em or datetime.now(),
+        'dados_jogos': dados_jogos,
+        'tabela_odds': tabela_odds,
+        'atualizacoes_odds': atualizacoes_odds,
+        'df': df,
+        'ligas': sorted(df['liga'].unique().tolist()) if not df.empty else [],
+        'posicoes_ligas': df.groupby('liga', sort=False).indices if not df.empty else {},
+        'fatias': {},
+    }
+    while len(conjuntos) > MAX_CONJUNTOS_PROCESSADOS:
+        conjuntos.pop(next(iter(conjuntos)))
+
+    st.session_state.chave_conjunto = chave
+    st.session_state.dados_jogos = dados_jogos
+    st.session_state.tabela_odds = tabela_odds
+    st.session_state.atualizacoes_odds = atualizacoes_odds
+    st.session_state.df_processado = df
+    return conjuntos[chave]
+
+
+def conjunto_processado_recente(chave):
+    """Conjunto memorizado para a chave, se ainda estiver dentro do TTL"""
+    conjunto = st.session_state.conjuntos_processados.get(chave)
+    if conjunto and (datetime.now() - conjunto['criado_em']).total_seconds() < TTL_CONJUNTO_PROCESSADO:
+        return conjunto
+    return None
+
+
+def conjunto_atual():
+    """Conjunto exibido no momento (recriado a partir de df_processado se tiver sido descartado)"""
+    conjunto = st.session_state.conjuntos_processados.get(st.session_state.chave_conjunto)
+    if conjunto is None or conjunto['df'] is not st.session_state.df_processado:
+        conjunto = guardar_conjunto_processado(st.session_state.chave_conjunto, st.session_state.dados_jogos,
+                                               st.session_state.tabela_odds, st.session_state.df_processado)
+    return conjunto
+
+
+def montar_conjunto_processado(chave, dados_jogos, tabela_odds, atualizacoes_odds=None, criado_em=None):
+    """Processa jogos + odds para a chave (data, bookmaker, filtro, comparar) e memoriza o resultado"""
+    _, id_bookmaker_chave, filtrar_sem_odds_chave, _ = chave
+    df = processar_dados_jogos_e_odds(dados_jogos, tabela_odds, None, filtrar_sem_odds_chave,
+                                      st.session_state.regras_selecao, id_bookmaker_chave)
+    # Colunas de exibição (links, escudos, odds formatadas) calculadas uma única vez
+    df = processar_dataframe_para_exibicao(df)
+    return guardar_conjunto_processado(chave, dados_jogos, tabela_odds, df, atualizacoes_odds, criado_em)
+
+
+@st.cache_data(ttl=TTL_CONJUNTO_PROCESSADO, show_spinner=False)
+def movimento_odds_resultado(data, id_bookmaker, ids_jogos, arquivos_captura):
+    """Abertura e odd atual do mercado de resultado dos jogos (ver `HistoricoOdds.abertura_e_atual`)
+
+    `arquivos_captura` entra só na chave do cache: uma captura nova invalida o resumo,
+    e os reruns sem captura nova não releem o Parquet da data.
+    """
+    return historico_odds.abertura_e_atual(data, fixture_ids=list(ids_jogos), bet_id=ID_APOSTA_RESULTADO,
+                                           bookmaker_id=id_bookmaker)
 
-        if isinstance(odd_value, (int, float)) and odd_value > 0:
-            return f"{odd_value:.2f}"
-        else:
-            return "N/A"
-    except (ValueError, TypeError):
+
+def descartar_conjuntos_comparacao(chave):
+    """Descarta os conjuntos de outros bookmakers da mesma (data, filtro) no modo comparação
+
+    Eles guardam a tabela de odds e as atualizações de antes da última atualização
+    incremental; ao trocar de bookmaker são remontados a partir da tabela da sessão.
+    """
+    conjuntos = st.session_state.conjuntos_processados
+    for outra in [outra for outra in conjuntos
+                  if outra != chave and outra[3] and (outra[0], outra[2]) == (chave[0], chave[2])]:
+        del conjuntos[outra]
+
+
+def fatia_por_liga(conjunto, liga):
+    """Linhas de uma liga, calculadas uma vez por conjunto; "Todas" devolve o próprio DataFrame"""
+    if liga == "Todas":
+        return conjunto['df']
+    if liga not in conjunto['fatias']:
+        conjunto['fatias'][liga] = conjunto['df'].iloc[conjunto['posicoes_ligas'].get(liga, [])]
+    return conjunto['fatias'][liga]
+
+
+def legenda_regras(regras):
+    """Linhas da legenda dos critérios, geradas a partir das regras de seleção ativas"""
+    return [f"{i}️⃣ {descricao} → '{nome}'" for i, (nome, descricao) in enumerate(regras.descrever(), start=1)]
+
+
+# Colunas de melhor preço (modo de comparação de bookmakers): sufixo -> coluna exibida
+COLUNAS_MELHOR_PRECO = {
+    'casa': 'Melhor Casa',
+    'empate': 'Melhor X',
+    'fora': 'Melhor Fora',
+    'gols_casa': 'Melhor Gols Casa',
+    'gols_fora': 'Melhor Gols Fora',
+}
+
+
+def formatar_odds_coluna(odds, legendas=None):
+    """Formata uma coluna inteira de odds com 2 casas ("N/A" para inválidas), com legenda opcional"""
+    if odds is None:
         return "N/A"
 
+    odds = pd.to_numeric(odds, errors='coerce')
+    texto = odds.map('{:.2f}'.format)
+    validas = odds.notna()
+    if legendas is None:
+        validas &= odds > 0
+    else:
+        validas &= (odds != 0) & legendas.notna()
+        texto = texto + ' (' + legendas.astype(str) + ')'
+
+    return texto.where(validas, "N/A")
+
 
 def processar_dataframe_para_exibicao(df):
-    """Processa o DataFrame para exibição com logos e formatação adequada"""
+    """Processa o DataFrame para exibição com logos e formatação adequada
+
+    Chamada uma vez por conjunto de dados (ao carregar jogos e odds); as colunas
+    geradas acompanham o DataFrame em `st.session_state.df_processado`.
+    """
     if df.empty:
         return df
 
@@ -272,53 +406,31 @@ def processar_dataframe_para_exibicao(df):
     df_display['Time Fora'] = df_display['time_fora']
 
     # Criar URLs para tornar os nomes clicáveis (usando query params)
-    df_display['Link Casa'] = df_display.apply(
-        lambda
-            row: f"?team_id={row['team_home_id']}&league_id={row['league_id']}&season={row['season']}&team_name={row['time_casa']}",
-        axis=1
-    )
-
-    df_display['Link Fora'] = df_display.apply(
-        lambda
-            row: f"?team_id={row['team_away_id']}&league_id={row['league_id']}&season={row['season']}&team_name={row['time_fora']}",
-        axis=1
-    )
-
-    # Formatar odds com legendas - com verificação de tipo
-    def formatar_odd_gols(odd_value, legenda_value):
-        """Formata odds de gols com verificação de tipo"""
-        try:
-            if pd.notna(odd_value) and pd.notna(legenda_value):
-                # Converter para float se for string
-                if isinstance(odd_value, str):
-                    odd_value = float(odd_value)
-                if isinstance(odd_value, (int, float)) and odd_value != 0:
-                    return f"{odd_value:.2f} ({legenda_value})"
-            return "N/A"
-        except (ValueError, TypeError):
-            return "N/A"
-
-    if 'legenda_gols_casa' in df_display.columns:
-        df_display['Gols Casa'] = df_display.apply(
-            lambda row: formatar_odd_gols(row.get('odd_gols_casa'), row.get('legenda_gols_casa')),
-            axis=1
-        )
-    else:
-        # Se não tiver legenda, usar apenas a odd
-        df_display['Gols Casa'] = df_display.apply(
-            lambda row: safe_format_odd(row.get('odd_gols_casa')), axis=1
-        )
-
-    if 'legenda_gols_fora' in df_display.columns:
-        df_display['Gols Fora'] = df_display.apply(
-            lambda row: formatar_odd_gols(row.get('odd_gols_fora'), row.get('legenda_gols_fora')),
-            axis=1
-        )
-    else:
-        # Se não tiver legenda, usar apenas a odd
-        df_display['Gols Fora'] = df_display.apply(
-            lambda row: safe_format_odd(row.get('odd_gols_fora')), axis=1
-        )
+    sufixo_liga = ('&league_id=' + df_display['league_id'].astype(str) +
+                   '&season=' + df_display['season'].astype(str) + '&team_name=')
+    df_display['Link Casa'] = ('?team_id=' + df_display['team_home_id'].astype(str) +
+                               sufixo_liga + df_display['time_casa'].astype(str))
+    df_display['Link Fora'] = ('?team_id=' + df_display['team_away_id'].astype(str) +
+                               sufixo_liga + df_display['time_fora'].astype(str))
+
+    # Formatar odds com legendas (colunas inteiras; odd ausente, inválida ou zero vira "N/A")
+    for lado in ('casa', 'fora'):
+        coluna_gols = f'Gols {lado.capitalize()}'
+        if f'legenda_gols_{lado}' in df_display.columns:
+            df_display[coluna_gols] = formatar_odds_coluna(df_display.get(f'odd_gols_{lado}'),
+                                                           df_display[f'legenda_gols_{lado}'])
+        else:
+            # Se não tiver legenda, usar apenas a odd
+            df_display[coluna_gols] = formatar_odds_coluna(df_display.get(f'odd_gols_{lado}'))
+
+    # Melhor preço entre os bookmakers (modo de comparação): "odd (bookmaker)"
+    for sufixo, coluna_melhor in COLUNAS_MELHOR_PRECO.items():
+        if f'melhor_odd_{sufixo}' not in df_display.columns:
+            continue
+        nomes = df_display[f'melhor_bookmaker_{sufixo}'].map(BOOKMAKERS)
+        if f'melhor_linha_{sufixo}' in df_display.columns:
+            nomes = 'Mais de ' + df_display[f'melhor_linha_{sufixo}'].map('{:.1f}'.format) + ', ' + nomes
+        df_display[coluna_melhor] = formatar_odds_coluna(df_display[f'melhor_odd_{sufixo}'], nomes)
 
     return df_display
 
@@ -866,7 +978,7 @@ def mostrar_modal_comparacao(time_casa_id, time_casa_nome, time_fora_id, time_fo
                         "Estatística": st.column_config.TextColumn("Estatística", width="medium"),
                         f"🏠 {time_casa_nome}": st.column_config.TextColumn(f"🏠 {time_casa_nome}", width="medium"),
                         f"✈️ {time_fora_nome}": st.column_config.TextColumn(f"✈️ {time_fora_nome}", width="medium"),
-                        "Critério": st.column_config.TextColumn("Critério", help="Critério usado: 'Gols' (ambos marcam) ou 'Resultado/Gol' (favorito + gol)", width="medium"),
+                        "Critério": st.column_config.TextColumn("Critério", help="Nome da regra de seleção atendida pelo jogo", width="medium"),
 
                     },
                     hide_index=True,
@@ -946,224 +1058,271 @@ def mostrar_modal_comparacao(time_casa_id, time_casa_nome, time_fora_id, time_fo
 
 
 def exportar_para_excel(df):
-    """Exporta DataFrame para Excel com formatação melhorada incluindo coluna Critério"""
+    """Exporta DataFrame para Excel com formatação melhorada incluindo coluna Critério
+
+    Os formatos são aplicados por coluna (set_column) e por formatação condicional
+    (coluna Critério); as linhas são gravadas em sequência no modo `constant_memory`
+    do xlsxwriter, sem manter a planilha inteira em memória.
+    """
     output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Jogos e Estatísticas')
+
+    # ===== FORMATOS DE FORMATAÇÃO =====
+
+    # Formato do cabeçalho
+    header_format = workbook.add_format({
+        'bold': True,
+        'text_wrap': True,
+        'valign': 'top',
+        'fg_color': '#D7E4BD',
+        'border': 1,
+        'font_size': 11
+    })
+
+    # Cabeçalho especial para coluna critério
+    criterio_header_format = workbook.add_format({
+        'bold': True,
+        'text_wrap': True,
+        'valign': 'top',
+        'fg_color': '#FFE0B2',  # Laranja mais claro
+        'border': 2,
+        'font_size': 11,
+        'font_color': '#E65100'
+    })
+
+    # Cabeçalho especial para coluna país
+    pais_header_format = workbook.add_format({
+        'bold': True,
+        'text_wrap': True,
+        'valign': 'top',
+        'fg_color': '#E1F5FE',  # Azul claro
+        'border': 2,
+        'font_size': 11
+    })
+
+    # Formato para time casa (verde claro)
+    home_format = workbook.add_format({
+        'bg_color': '#E8F5E9',
+        'border': 1,
+        'align': 'center'
+    })
+
+    # Formato para time fora (vermelho claro)
+    away_format = workbook.add_format({
+        'bg_color': '#FFEBEE',
+        'border': 1,
+        'align': 'center'
+    })
+
+    # Formatos condicionais da coluna Critério
+    criterio_gols_format = workbook.add_format({
+        'bg_color': '#FFF3E0',  # Laranja claro para "Gols"
+        'border': 1,
+        'bold': True,
+        'font_color': '#E65100'  # Texto laranja escuro
+    })
+
+    criterio_resultado_format = workbook.add_format({
+        'bg_color': '#E3F2FD',  # Azul claro para "Resultado/Gol"
+        'border': 1,
+        'bold': True,
+        'font_color': '#0D47A1'  # Texto azul escuro
+    })
+
+    # Formato para células normais
+    normal_format = workbook.add_format({
+        'border': 1,
+        'align': 'center'
+    })
+
+    # Formato para números (odds)
+    number_format = workbook.add_format({
+        'border': 1,
+        'align': 'center',
+        'num_format': '0.00'
+    })
+
+    # ===== IDENTIFICAR COLUNAS IMPORTANTES =====
+
+    col_casa = None
+    col_fora = None
+    col_criterio = None
+    col_pais = None
+    colunas_odds = []  # Para formatar odds como números
+
+    for idx, col in enumerate(df.columns):
+        col_lower = col.lower()
+
+        # Identificar colunas de times
+        if 'casa' in col_lower and ('time' in col_lower or col.strip() == ' '):
+            col_casa = idx
+        elif 'fora' in col_lower and ('time' in col_lower or col.strip() == '  '):
+            col_fora = idx
+        # Identificar coluna critério
+        elif 'critério' in col_lower or 'criterio' in col_lower:
+            col_criterio = idx
+        # Identificar coluna país
+        elif 'país' in col_lower or 'pais' in col_lower:
+            col_pais = idx
+        # Identificar colunas de odds (para formatação numérica)
+        elif any(word in col_lower for word in ['odd', 'casa', 'fora', 'gols']) and 'time' not in col_lower:
+            if col not in ['Time Casa', 'Time Fora', 'Gols Casa', 'Gols Fora']:
+                colunas_odds.append(idx)
+
+    # ===== LARGURA E FORMATO DE CADA COLUNA =====
+
+    for i, col in enumerate(df.columns):
+        if i == col_casa:
+            formato_coluna = home_format
+        elif i == col_fora:
+            formato_coluna = away_format
+        elif i in colunas_odds:
+            formato_coluna = number_format
+        else:
+            formato_coluna = normal_format
+
+        # Largura especial para algumas colunas
+        if i == col_criterio:
+            largura = 15  # Critério um pouco mais largo
+        elif 'Time' in col:
+            largura = 18  # Times mais largos
+        elif col.strip() in [' ', '  ']:  # Colunas de escudo
+            largura = 5  # Escudos pequenos
+        elif any(word in col.lower() for word in ['odd', 'gols']):
+            largura = 12  # Odds médias
+        else:
+            # Largura automática baseada no conteúdo
+            column_len = max(
+                df[col].astype(str).str.len().max() if not df[col].empty else 0,
+                len(col)
+            ) + 3
+            largura = min(column_len, 25)  # Máximo 25 caracteres
+
+        worksheet.set_column(i, i, largura, formato_coluna)
+
+    # ===== CABEÇALHO =====
+
+    for col_num, value in enumerate(df.columns.values):
+        if col_num == col_criterio:
+            worksheet.write(0, col_num, value, criterio_header_format)
+        elif col_num == col_pais:
+            worksheet.write(0, col_num, value, pais_header_format)
+        else:
+            worksheet.write(0, col_num, value, header_format)
 
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Jogos e Estatísticas', index=False)
-
-        # Obter o objeto workbook e worksheet
-        workbook = writer.book
-        worksheet = writer.sheets['Jogos e Estatísticas']
-
-        # ===== FORMATOS DE FORMATAÇÃO =====
-
-        # Formato do cabeçalho
-        header_format = workbook.add_format({
-            'bold': True,
-            'text_wrap': True,
-            'valign': 'top',
-            'fg_color': '#D7E4BD',
-            'border': 1,
-            'font_size': 11
-        })
-
-        # Formato para time casa (verde claro)
-        home_format = workbook.add_format({
-            'bg_color': '#E8F5E9',
-            'border': 1,
-            'align': 'center'
-        })
-
-        # Formato para time fora (vermelho claro)
-        away_format = workbook.add_format({
-            'bg_color': '#FFEBEE',
-            'border': 1,
-            'align': 'center'
-        })
-
-        # NOVOS FORMATOS PARA COLUNA CRITÉRIO
-        criterio_gols_format = workbook.add_format({
-            'bg_color': '#FFF3E0',  # Laranja claro para "Gols"
-            'border': 1,
-            'bold': True,
-            'align': 'center',
-            'font_color': '#E65100'  # Texto laranja escuro
-        })
-
-        criterio_resultado_format = workbook.add_format({
-            'bg_color': '#E3F2FD',  # Azul claro para "Resultado/Gol"
-            'border': 1,
-            'bold': True,
-            'align': 'center',
-            'font_color': '#0D47A1'  # Texto azul escuro
-        })
-
-        # Formato para células normais
-        normal_format = workbook.add_format({
-            'border': 1,
-            'align': 'center'
-        })
-
-        # Formato para números (odds)
-        number_format = workbook.add_format({
-            'border': 1,
-            'align': 'center',
-            'num_format': '0.00'
-        })
-
-        # ===== IDENTIFICAR COLUNAS IMPORTANTES =====
-
-        col_casa = None
-        col_fora = None
-        col_criterio = None
-        col_pais = None
-        colunas_odds = []  # Para formatar odds como números
-
-        for idx, col in enumerate(df.columns):
-            col_lower = col.lower()
-
-            # Identificar colunas de times
-            if 'casa' in col_lower and ('time' in col_lower or col.strip() == ' '):
-                col_casa = idx
-            elif 'fora' in col_lower and ('time' in col_lower or col.strip() == '  '):
-                col_fora = idx
-            # Identificar coluna critério
-            elif 'critério' in col_lower or 'criterio' in col_lower:
-                col_criterio = idx
-            # Identificar coluna país
-            elif 'país' in col_lower or 'pais' in col_lower:
-                col_pais = idx
-            # Identificar colunas de odds (para formatação numérica)
-            elif any(word in col_lower for word in ['odd', 'casa', 'fora', 'gols']) and 'time' not in col_lower:
-                if col not in ['Time Casa', 'Time Fora', 'Gols Casa', 'Gols Fora']:
-                    colunas_odds.append(idx)
-
-        # ===== FORMATAÇÃO DO CABEÇALHO =====
-
-        for col_num, value in enumerate(df.columns.values):
-            # Cabeçalho especial para coluna critério
-            if col_num == col_criterio:
-                criterio_header_format = workbook.add_format({
-                    'bold': True,
-                    'text_wrap': True,
-                    'valign': 'top',
-                    'fg_color': '#FFE0B2',  # Laranja mais claro
-                    'border': 2,
-                    'font_size': 11,
-                    'font_color': '#E65100'
-                })
-                worksheet.write(0, col_num, value, criterio_header_format)
-            # Cabeçalho especial para coluna país
-            elif col_num == col_pais:
-                pais_header_format = workbook.add_format({
-                    'bold': True,
-                    'text_wrap': True,
-                    'valign': 'top',
-                    'fg_color': '#E1F5FE',  # Azul claro
-                    'border': 2,
-                    'font_size': 11
-                })
-                worksheet.write(0, col_num, value, pais_header_format)
-            else:
-                worksheet.write(0, col_num, value, header_format)
+    # ===== DADOS (linha a linha, herdando o formato da coluna) =====
 
-        # ===== FORMATAÇÃO DAS CÉLULAS DE DADOS =====
+    # Odds chegam como número ou "N/A"; texto numérico vira número como na versão anterior
+    dados = df.copy(deep=False)
+    for idx in colunas_odds:
+        coluna = dados.iloc[:, idx]
+        numeros = pd.to_numeric(coluna, errors='coerce')
+        dados[dados.columns[idx]] = numeros.astype(object).where(numeros.notna(), coluna)
 
-        for row_num in range(1, len(df) + 1):
-            for col_num in range(len(df.columns)):
-                value = df.iloc[row_num - 1, col_num]
+    for row_num, linha in enumerate(dados.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row_num, 0, linha)
 
-                # Formatação especial para coluna Critério
-                if col_num == col_criterio:
-                    if value == 'Gols':
-                        worksheet.write(row_num, col_num, value, criterio_gols_format)
-                    elif value == 'Resultado/Gol':
-                        worksheet.write(row_num, col_num, value, criterio_resultado_format)
-                    else:
-                        # Célula vazia ou outro valor
-                        worksheet.write(row_num, col_num, value, normal_format)
-
-                # Formatação para time casa (verde)
-                elif col_num == col_casa:
-                    worksheet.write(row_num, col_num, value, home_format)
-
-                # Formatação para time fora (vermelho)
-                elif col_num == col_fora:
-                    worksheet.write(row_num, col_num, value, away_format)
-
-                # Formatação para colunas de odds (numéricas)
-                elif col_num in colunas_odds:
-                    try:
-                        # Tentar converter para float se for numérico
-                        numeric_value = float(value) if pd.notna(value) and str(value).replace('.', '').replace(',',
-                                                                                                                '').isdigit() else value
-                        worksheet.write(row_num, col_num, numeric_value, number_format)
-                    except (ValueError, TypeError):
-                        worksheet.write(row_num, col_num, value, normal_format)
-
-                # Formatação padrão para outras células
-                else:
-                    worksheet.write(row_num, col_num, value, normal_format)
-
-        # ===== AJUSTAR LARGURA DAS COLUNAS =====
-
-        for i, col in enumerate(df.columns):
-            # Largura especial para algumas colunas
-            if i == col_criterio:
-                worksheet.set_column(i, i, 15)  # Critério um pouco mais largo
-            elif 'Time' in col:
-                worksheet.set_column(i, i, 18)  # Times mais largos
-            elif col.strip() in [' ', '  ']:  # Colunas de escudo
-                worksheet.set_column(i, i, 5)  # Escudos pequenos
-            elif any(word in col.lower() for word in ['odd', 'gols']):
-                worksheet.set_column(i, i, 12)  # Odds médias
+    # ===== FORMATAÇÃO CONDICIONAL DA COLUNA CRITÉRIO =====
+
+    if col_criterio is not None and len(df):
+        for criterio, formato in (('Gols', criterio_gols_format), ('Resultado/Gol', criterio_resultado_format)):
+            worksheet.conditional_format(1, col_criterio, len(df), col_criterio, {
+                'type': 'cell',
+                'criteria': '==',
+                'value': f'"{criterio}"',
+                'format': formato
+            })
+
+    # ===== ADICIONAR FILTROS =====
+
+    # Adicionar filtro automático
+    worksheet.autofilter(0, 0, len(df), len(df.columns) - 1)
+
+    # ===== CONGELAR PAINÉIS =====
+
+    # Congelar primeira linha (cabeçalho) e primeiras 3 colunas (Horário, País, Liga)
+    worksheet.freeze_panes(1, 3)
+
+    # ===== ADICIONAR TOTAIS/ESTATÍSTICAS =====
+
+    # Adicionar linha de totais se houver coluna critério
+    if col_criterio is not None:
+        total_row = len(df) + 2
+
+        # Contar critérios
+        criterios_count = df.iloc[:, col_criterio].value_counts()
+
+        # Escrever estatísticas
+        worksheet.write(total_row, 0, 'TOTAIS:', workbook.add_format({'bold': True, 'bg_color': '#F5F5F5'}))
+
+        col_atual = 1
+        for criterio, count in criterios_count.items():
+            if criterio == 'Gols':
+                format_total = workbook.add_format({'bold': True, 'bg_color': '#FFF3E0', 'border': 1})
+            elif criterio == 'Resultado/Gol':
+                format_total = workbook.add_format({'bold': True, 'bg_color': '#E3F2FD', 'border': 1})
             else:
-                # Largura automática baseada no conteúdo
-                column_len = max(
-                    df[col].astype(str).str.len().max() if not df[col].empty else 0,
-                    len(col)
-                ) + 3
-                worksheet.set_column(i, i, min(column_len, 25))  # Máximo 25 caracteres
+                format_total = workbook.add_format({'bold': True, 'bg_color': '#F5F5F5', 'border': 1})
+
+            worksheet.write(total_row, col_atual, f'{criterio}: {count}', format_total)
+            col_atual += 1
 
-        # ===== ADICIONAR FILTROS =====
+    workbook.close()
+    output.seek(0)
+    return output
 
-        # Adicionar filtro automático
-        worksheet.autofilter(0, 0, len(df), len(df.columns) - 1)
 
-        # ===== CONGELAR PAINÉIS =====
+# Colunas da tabela de análise (Parquet/CSV/Arrow), com estatísticas numéricas por lado
+COLUNAS_EXPORTACAO_ANALISE = [
+    'id_jogo', 'horario', 'país', 'liga', 'league_id', 'season',
+    'team_home_id', 'time_casa', 'team_away_id', 'time_fora',
+    'odd_casa', 'odd_empate', 'odd_fora',
+    'odd_gols_casa', 'linha_gols_casa', 'odd_gols_fora', 'linha_gols_fora',
+    'criterio_selecao'
+] + [f'{coluna}_{lado}' for coluna in COLUNAS_ESTATISTICAS for lado in ('casa', 'fora')]
 
-        # Congelar primeira linha (cabeçalho) e primeiras 3 colunas (Horário, País, Liga)
-        worksheet.freeze_panes(1, 3)
 
-        # ===== ADICIONAR TOTAIS/ESTATÍSTICAS =====
+def tabela_para_analise(df):
+    """Tabela final de jogos/odds/estatísticas com tipos numéricos (sem os textos "casa - fora")"""
+    colunas = [coluna for coluna in COLUNAS_EXPORTACAO_ANALISE if coluna in df.columns]
+    tabela = df[colunas].reset_index(drop=True)
+    colunas_odds = [coluna for coluna in colunas if coluna.startswith(('odd_', 'linha_'))]
+    return tabela.astype({coluna: 'float64' for coluna in colunas_odds})
 
-        # Adicionar linha de totais se houver coluna critério
-        if col_criterio is not None:
-            total_row = len(df) + 2
 
-            # Contar critérios
-            criterios_count = df.iloc[:, col_criterio].value_counts()
+def exportar_para_parquet(df):
+    """Exporta a tabela de análise em Parquet (snappy)"""
+    output = io.BytesIO()
+    tabela_para_analise(df).to_parquet(output, engine='pyarrow', compression='snappy', index=False)
+    output.seek(0)
+    return output
 
-            # Escrever estatísticas
-            worksheet.write(total_row, 0, 'TOTAIS:', workbook.add_format({'bold': True, 'bg_color': '#F5F5F5'}))
 
-            col_atual = 1
-            for criterio, count in criterios_count.items():
-                if criterio == 'Gols':
-                    format_total = workbook.add_format({'bold': True, 'bg_color': '#FFF3E0', 'border': 1})
-                elif criterio == 'Resultado/Gol':
-                    format_total = workbook.add_format({'bold': True, 'bg_color': '#E3F2FD', 'border': 1})
-                else:
-                    format_total = workbook.add_format({'bold': True, 'bg_color': '#F5F5F5', 'border': 1})
+def exportar_para_csv_gzip(df):
+    """Exporta a tabela de análise em CSV compactado com gzip"""
+    output = io.BytesIO()
+    tabela_para_analise(df).to_csv(output, index=False, compression={'method': 'gzip', 'mtime': 0})
+    output.seek(0)
+    return output
 
-                worksheet.write(total_row, col_atual, f'{criterio}: {count}', format_total)
-                col_atual += 1
 
+def exportar_para_arrow(df):
+    """Exporta a tabela de análise em Arrow IPC (formato de arquivo Feather v2)"""
+    output = io.BytesIO()
+    tabela_para_analise(df).to_feather(output)
     output.seek(0)
     return output
 
 
+# Formatos de exportação para análise: rótulo -> (extensão, mime, função)
+FORMATOS_EXPORTACAO_ANALISE = {
+    "Parquet (snappy)": ("parquet", "application/vnd.apache.parquet", exportar_para_parquet),
+    "CSV (gzip)": ("csv.gz", "application/gzip", exportar_para_csv_gzip),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file", exportar_para_arrow),
+}
+
+
 # Interface principal
 st.title("⚽ Odds de Futebol - Seleção de Estatísticas")
 st.markdown("---")
@@ -1180,6 +1339,9 @@ nomes_bookmakers = [f"{id} - {nome}" for id, nome in BOOKMAKERS.items()]
 indice_bookmaker = st.sidebar.selectbox("Selecionar Bookmaker:", range(len(opcoes_bookmakers)),
                                         format_func=lambda x: nomes_bookmakers[x], index=1)
 id_bookmaker = opcoes_bookmakers[indice_bookmaker]
+comparar_bookmakers = st.sidebar.checkbox("Comparar todos os bookmakers", value=False,
+                                          help="Carrega as odds de todos os bookmakers de uma vez e mostra o melhor "
+                                               "preço de cada mercado; trocar de bookmaker não faz nova busca na API")
 
 filtrar_sem_odds = st.sidebar.checkbox("Mostrar apenas jogos com odds de gols", value=True)
 mostrar_todos = st.sidebar.checkbox("Mostrar todos os registros (sem paginação)", value=True)
@@ -1187,15 +1349,24 @@ registros_por_pagina = None
 if not mostrar_todos:
     registros_por_pagina = st.sidebar.selectbox("Máximo de registros:", [10, 25, 50, 100], index=1)
 
+preaquecer_ligas = st.sidebar.checkbox("Pré-carregar estatísticas das ligas inteiras", value=False,
+                                       help="Busca todos os times das ligas dos jogos selecionados, não só os "
+                                            "times envolvidos (gasta mais cota da API)")
+
 altura_tabela = st.sidebar.selectbox("Altura da Tabela:", ["Auto", "Pequena (300px)", "Média (500px)",
                                                            "Grande (700px)", "Extra Grande (900px)"], index=0)
 
 if st.sidebar.button("🗑️ Limpar Cache"):
     st.cache_data.clear()
+    api_cache.clear()
+    estatisticas_memorizadas.clear()
     st.session_state.dados_carregados = False
     st.session_state.dados_jogos = None
-    st.session_state.dados_odds = None
+    st.session_state.tabela_odds = None
+    st.session_state.atualizacoes_odds = None
     st.session_state.df_processado = pd.DataFrame()
+    st.session_state.conjuntos_processados = {}
+    st.session_state.chave_conjunto = None
     st.session_state.jogos_selecionados = []
     st.session_state.estatisticas_carregadas = False
     st.session_state.selecoes_manuais = set()
@@ -1204,10 +1375,43 @@ if st.sidebar.button("🗑️ Limpar Cache"):
     st.sidebar.success("Cache limpo! Reiniciando a aplicação.")
     st.rerun()
 
+with st.sidebar.expander("🧩 Regras de Seleção", expanded=False):
+    with open(settings.selection_rules_file, encoding='utf-8') as arquivo_regras:
+        texto_regras = st.text_area("Regras (JSON):", value=arquivo_regras.read(), height=300,
+                                    help="Cada regra: nome, prioridade (menor vence) e condição com cláusulas "
+                                         "{mercado, linha, comparador, limite} agrupadas em 'todos' (E) ou 'algum' (OU)")
+    if st.button("✅ Aplicar Regras", use_container_width=True):
+        try:
+            st.session_state.regras_selecao = regras_de_texto(texto_regras)
+        except ValueError as e:
+            st.error(f"Regras inválidas: {str(e)}")
+        else:
+            if st.session_state.dados_carregados and not st.session_state.df_processado.empty:
+                df_regras = aplicar_criterios_selecao(st.session_state.df_processado,
+                                                      st.session_state.tabela_odds,
+                                                      st.session_state.regras_selecao,
+                                                      st.session_state.chave_conjunto[1])
+                # Conjuntos memorizados foram avaliados com as regras anteriores (os dados continuam os mesmos)
+                criado_em = conjunto_atual()['criado_em']
+                st.session_state.conjuntos_processados = {}
+                guardar_conjunto_processado(st.session_state.chave_conjunto, st.session_state.dados_jogos,
+                                            st.session_state.tabela_odds, df_regras, criado_em=criado_em)
+                st.session_state.jogos_selecionados = df_regras[df_regras['selecao_automatica']]['id_jogo'].tolist()
+                st.session_state.selecoes_manuais = set()
+                st.session_state.estatisticas_carregadas = False
+            st.rerun()
+    for linha_legenda in legenda_regras(st.session_state.regras_selecao):
+        st.caption(linha_legenda)
+
 st.sidebar.markdown("---")
 st.sidebar.write(f"**Data:** {data_selecionada.strftime('%d/%m/%Y')}")
 st.sidebar.write(f"**Bookmaker:** {BOOKMAKERS[id_bookmaker]}")
 st.sidebar.write("**Fuso Horário:** Brasília (UTC-3)")
+stats_cache_api = api_cache.stats()
+st.sidebar.caption(
+    f"💾 Cache da API: {stats_cache_api['hits']} hits / {stats_cache_api['misses']} misses "
+    f"({stats_cache_api['entradas']} respostas, {stats_cache_api['bytes'] / 1024 / 1024:.1f} MB)"
+)
 
 # Verificar query parameters para abrir modal
 query_params = st.query_params
@@ -1236,12 +1440,40 @@ with col1:
     st.info("💡 Configure os filtros acima e clique no botão para buscar os dados da API.")
 with col2:
     btn_buscar_dados = st.button("🔍 Buscar Jogos e Odds", type="primary", use_container_width=True)
+    btn_atualizar_odds = st.button("⚡ Atualizar Odds", use_container_width=True,
+                                   disabled=not st.session_state.dados_carregados,
+                                   help=f"Busca de novo só as odds dos jogos que começam nos próximos "
+                                        f"{settings.odds_refresh_window_minutes} min ou verificados há mais de "
+                                        f"{settings.odds_max_age_minutes} min")
 with col3:
     if st.session_state.dados_carregados:
         st.success("✅ Dados carregados")
     else:
         st.warning("⏳ Dados não carregados")
 
+# Atualização incremental: só os jogos próximos do início ou com odds velhas, sem refazer a data inteira
+if btn_atualizar_odds and st.session_state.dados_carregados:
+    chave = st.session_state.chave_conjunto
+    ids_bookmakers = list(BOOKMAKERS.keys()) if chave[3] else [chave[1]]
+    atualizacoes_odds = st.session_state.atualizacoes_odds
+    if atualizacoes_odds is None:
+        atualizacoes_odds = atualizacoes_por_jogo(None)
+
+    with st.spinner("⚡ Atualizando odds dos jogos próximos..."):
+        tabela_odds, atualizacoes_odds, consultados, alterados = atualizar_odds_incremental(
+            st.session_state.dados_jogos, st.session_state.tabela_odds, atualizacoes_odds, ids_bookmakers, chave[0]
+        )
+
+    if chave[3]:
+        descartar_conjuntos_comparacao(chave)
+    if alterados:
+        montar_conjunto_processado(chave, st.session_state.dados_jogos, tabela_odds, atualizacoes_odds)
+        st.session_state.estatisticas_carregadas = False
+    else:
+        conjunto_atual()['atualizacoes_odds'] = atualizacoes_odds
+        st.session_state.atualizacoes_odds = atualizacoes_odds
+    st.toast(f"⚡ {consultados} jogo(s) consultado(s), {alterados} com odds novas")
+
 # Consultar dados ao clicar no botão
 if btn_buscar_dados:
     st.session_state.dados_carregados = False
@@ -1251,56 +1483,80 @@ if btn_buscar_dados:
     st.session_state.time_selecionado_modal = None
     st.session_state.comparacao_modal = None
 
-    with st.spinner("🔄 Carregando jogos..."):
-        dados_jogos = buscar_jogos_por_data(data_str)
-        st.session_state.dados_jogos = dados_jogos
+    chave = (data_str, id_bookmaker, filtrar_sem_odds, comparar_bookmakers)
+    conjunto = conjunto_processado_recente(chave)
 
-    if not dados_jogos:
-        st.error("❌ Não foi possível carregar os dados dos jogos.")
-        st.stop()
+    if conjunto is not None:
+        # Mesma data, bookmaker e filtro consultados há pouco: reaproveita o DataFrame processado
+        df = guardar_conjunto_processado(chave, conjunto['dados_jogos'], conjunto['tabela_odds'], conjunto['df'],
+                                         criado_em=conjunto['criado_em'])['df']
+    else:
+        with st.spinner("🔄 Carregando jogos..."):
+            dados_jogos = buscar_jogos_por_data(data_str)
+
+        if not dados_jogos:
+            st.error("❌ Não foi possível carregar os dados dos jogos.")
+            st.stop()
 
-    with st.spinner("🔄 Carregando todas as odds (com paginação)..."):
-        dados_odds = buscar_todas_odds_por_data_e_bookmaker(data_str, id_bookmaker)
-        st.session_state.dados_odds = dados_odds
+        with st.spinner("🔄 Carregando todas as odds (com paginação)..."):
+            if comparar_bookmakers:
+                tabela_odds, atualizacoes_odds = buscar_tabela_odds_varios_bookmakers(data_str,
+                                                                                      tuple(BOOKMAKERS.keys()))
+            else:
+                tabela_odds, atualizacoes_odds = buscar_tabela_odds(data_str, id_bookmaker)
 
-    if not dados_odds or not dados_odds.get('response'):
-        st.warning("⚠️ Não foi possível carregar os dados de odds para este bookmaker e data.")
+        if tabela_odds.empty:
+            st.warning("⚠️ Não foi possível carregar os dados de odds para este bookmaker e data.")
 
-    with st.spinner("🔄 Processando dados..."):
-        df = processar_dados_jogos_e_odds(st.session_state.dados_jogos, st.session_state.dados_odds, None,
-                                          filtrar_sem_odds)
-        st.session_state.df_processado = df
+        with st.spinner("🔄 Processando dados..."):
+            df = montar_conjunto_processado(chave, dados_jogos, tabela_odds, atualizacoes_odds)['df']
 
     # Inicializar seleções automáticas na primeira carga de dados
     selecoes_automaticas = df[df['selecao_automatica'] == True]['id_jogo'].tolist()
     st.session_state.jogos_selecionados = selecoes_automaticas
     if selecoes_automaticas:
         st.info(f"🎯 {len(selecoes_automaticas)} jogo(s) selecionado(s) automaticamente baseado nos critérios:\n"
-                f"• Critério 1 (Resultado/Gol): Time casa odd ≥ 1.5 E Time fora marca gol (Over 0.5) ≥ 1.5\n"
-                f"• Critério 2 (Resultado/Gol): Time fora odd ≥ 1.5 E Time casa marca gol (Over 0.5) ≥ 1.5\n"
-                f"• Critério 3 (Gols): Time casa marca gol (Over 0.5) ≥ 1.5 E Time fora marca gol (Over 0.5) ≥ 1.5\n"
-                f"\n🏷️ Veja a coluna 'Critério' para identificar qual regra foi aplicada")
+                + "\n".join(legenda_regras(st.session_state.regras_selecao))
+                + "\n\n🏷️ Veja a coluna 'Critério' para identificar qual regra foi aplicada")
 
     st.session_state.dados_carregados = True
     st.rerun()
 
 # Se dados já estiverem carregados
 if st.session_state.dados_carregados:
-    df_base = st.session_state.df_processado.copy()
+    # Com todos os bookmakers carregados, trocar de bookmaker só reprocessa a tabela já em memória
+    chave_carregada = st.session_state.chave_conjunto
+    if comparar_bookmakers and chave_carregada[3] and chave_carregada[1] != id_bookmaker:
+        chave_troca = (chave_carregada[0], id_bookmaker, chave_carregada[2], True)
+        conjunto_troca = st.session_state.conjuntos_processados.get(chave_troca)
+        if conjunto_troca is not None:
+            guardar_conjunto_processado(chave_troca, conjunto_troca['dados_jogos'], conjunto_troca['tabela_odds'],
+                                        conjunto_troca['df'], criado_em=conjunto_troca['criado_em'])
+        else:
+            # Mesmos jogos e odds do conjunto carregado: herda o momento da busca para o TTL
+            montar_conjunto_processado(chave_troca, st.session_state.dados_jogos, st.session_state.tabela_odds,
+                                       criado_em=conjunto_atual()['criado_em'])
+        st.session_state.estatisticas_carregadas = False
+
+        # Os critérios mudam com o bookmaker: a seleção volta às escolhas automáticas do novo conjunto
+        df_troca = st.session_state.df_processado
+        st.session_state.jogos_selecionados = (
+            df_troca[df_troca['selecao_automatica'] == True]['id_jogo'].tolist() if not df_troca.empty else []
+        )
+        st.session_state.selecoes_manuais = set()
+
+    conjunto = conjunto_atual()
+    df_base = conjunto['df']
 
     if df_base.empty:
         st.warning("⚠️ Nenhum jogo encontrado para os filtros selecionados.")
         st.stop()
 
-    ligas = sorted(df_base['liga'].unique().tolist())
-    ligas.insert(0, "Todas")
+    ligas = ["Todas"] + conjunto['ligas']
     liga_selecionada = st.selectbox("🏆 Filtrar por Liga:", ligas, key="filtro_liga")
 
-    # Aplicar filtro de liga
-    if liga_selecionada != "Todas":
-        df_filtrado_exibicao = df_base[df_base['liga'] == liga_selecionada].copy()
-    else:
-        df_filtrado_exibicao = df_base.copy()
+    # Aplicar filtro de liga (fatia memorizada, sem cópia)
+    df_filtrado_exibicao = fatia_por_liga(conjunto, liga_selecionada)
 
     # Exibir estatísticas gerais
     col1, col2, col3, col4 = st.columns(4)
@@ -1311,8 +1567,32 @@ if st.session_state.dados_carregados:
     with col3:
         st.metric("Países Únicos", df_base['país'].nunique())
     with col4:
-        jogos_com_odds_gols = df_base[(df_base['odd_gols_casa'].notna()) & (df_base['odd_gols_fora'].notna())]
-        st.metric("Jogos com Odds de Gols", len(jogos_com_odds_gols))
+        jogos_com_odds_gols = (df_base['odd_gols_casa'].notna() & df_base['odd_gols_fora'].notna()).sum()
+        st.metric("Jogos com Odds de Gols", int(jogos_com_odds_gols))
+
+    # Movimento das odds de resultado desde a abertura (histórico de capturas da data)
+    with st.expander("📉 Movimento das Odds (histórico)", expanded=False):
+        variacao_minima = st.slider("Variação mínima (%)", min_value=0, max_value=50, value=5, step=1)
+        data_movimento, id_bookmaker_movimento = st.session_state.chave_conjunto[:2]
+        movimento = movimento_odds_resultado(data_movimento, id_bookmaker_movimento,
+                                             tuple(df_base['id_jogo'].tolist()),
+                                             tuple(historico_odds.arquivos(data_movimento)))
+        movimento = movimento[(movimento['capturas'] > 1) & (movimento['variacao_pct'].abs() >= variacao_minima)]
+        if movimento.empty:
+            st.info("Nenhuma odd de resultado se moveu além do limite desde a primeira captura do dia.")
+        else:
+            movimento = movimento.merge(df_base[['id_jogo', 'horario', 'liga', 'time_casa', 'time_fora']],
+                                        left_on='fixture_id', right_on='id_jogo')
+            st.dataframe(
+                movimento[['horario', 'liga', 'time_casa', 'time_fora', 'label', 'odd_abertura', 'odd_atual',
+                           'variacao_pct', 'capturas']]
+                .sort_values('variacao_pct', key=abs, ascending=False)
+                .rename(columns={'horario': 'Horário', 'liga': 'Liga', 'time_casa': 'Time Casa',
+                                 'time_fora': 'Time Fora', 'label': 'Seleção', 'odd_abertura': 'Abertura',
+                                 'odd_atual': 'Atual', 'variacao_pct': 'Variação (%)', 'capturas': 'Capturas'}),
+                hide_index=True,
+                column_config={"Variação (%)": st.column_config.NumberColumn(format="%.1f%%")}
+            )
 
     st.markdown("---")
     st.subheader("📈 Seleção de Jogos para Estatísticas")
@@ -1329,17 +1609,16 @@ if st.session_state.dados_carregados:
             st.write("🏷️ = Coluna Critério identifica a regra usada")  # ← NOVA INFORMAÇÃO
         with col2:
             st.write("**Critérios de Seleção Automática:**")
-            st.write("1️⃣ Casa ≥1.5 E Fora marca(0.5) ≥1.5 → 'Resultado/Gol'")  # ← ATUALIZADO
-            st.write("2️⃣ Fora ≥1.5 E Casa marca(0.5) ≥1.5 → 'Resultado/Gol'")  # ← ATUALIZADO
-            st.write("3️⃣ Casa marca(0.5) ≥1.5 E Fora marca(0.5) ≥1.5 → 'Gols'")  # ← ATUALIZADO
+            for linha_legenda in legenda_regras(st.session_state.regras_selecao):
+                st.write(linha_legenda)
             st.write("✓ = Marque jogos para buscar estatísticas")
             st.write("🔗 = Clique nas linhas para ver estatísticas")
 
-    # Processar DataFrame para exibição melhorada
-    df_display = processar_dataframe_para_exibicao(df_filtrado_exibicao)
-
-    # Adicionar coluna de checkbox para seleção interativa
-    df_display['Selecionar'] = df_display['id_jogo'].isin(st.session_state.jogos_selecionados)
+    # Colunas de exibição já vêm prontas de df_processado; só a coluna de checkbox
+    # para seleção interativa é acrescentada (assign não altera a fatia memorizada)
+    df_display = df_filtrado_exibicao.assign(
+        Selecionar=df_filtrado_exibicao['id_jogo'].isin(st.session_state.jogos_selecionados)
+    )
 
     # Paginação
     total_registros_exibicao = len(df_display)
@@ -1347,7 +1626,7 @@ if st.session_state.dados_carregados:
         df_para_exibir = df_display.head(registros_por_pagina)
         registros_exibidos = len(df_para_exibir)
     else:
-        df_para_exibir = df_display.copy()
+        df_para_exibir = df_display
         registros_exibidos = total_registros_exibicao
 
     st.info(f"Mostrando {registros_exibidos} de {total_registros_exibicao} jogos para seleção.")
@@ -1358,6 +1637,7 @@ if st.session_state.dados_carregados:
         'escudo_casa', 'Time Casa', 'escudo_fora', 'Time Fora',
         'odd_casa', 'odd_empate', 'odd_fora',
         'Gols Casa', 'Gols Fora',
+        *[coluna for coluna in COLUNAS_MELHOR_PRECO.values() if coluna in df_display.columns],
         'criterio_selecao', 'selecao_automatica'  # ← CRITÉRIO ADICIONADO
     ]
 
@@ -1419,7 +1699,7 @@ if st.session_state.dados_carregados:
             "Gols Fora": st.column_config.TextColumn("Gols Fora", width="medium"),
             "Critério": st.column_config.TextColumn(
                 "Critério",
-                help="Tipo de critério: 'Gols' ou 'Resultado/Gol'",
+                help="Nome da regra de seleção atendida (veja as Regras de Seleção na barra lateral)",
                 width="small"
             ),
             "Auto": st.column_config.CheckboxColumn(
@@ -1515,7 +1795,8 @@ if st.session_state.dados_carregados:
     if btn_buscar_stats:
         if st.session_state.jogos_selecionados:
             with st.spinner("🚀 Buscando e adicionando estatísticas aos jogos selecionados..."):
-                df_com_stats = buscar_estatisticas_para_jogos_selecionados(df_base, st.session_state.jogos_selecionados)
+                df_com_stats = buscar_estatisticas_para_jogos_selecionados(df_base, st.session_state.jogos_selecionados,
+                                                                           preaquecer_ligas)
                 st.session_state.df_processado_com_stats = df_com_stats
             st.session_state.estatisticas_carregadas = True
             st.rerun()
@@ -1532,34 +1813,28 @@ if st.session_state.dados_carregados:
     if st.session_state.estatisticas_carregadas and 'df_processado_com_stats' in st.session_state:
         df_final_display = st.session_state.df_processado_com_stats[
             st.session_state.df_processado_com_stats['id_jogo'].isin(st.session_state.jogos_selecionados)
-        ].copy()
+        ]
 
         if df_final_display.empty:
             st.warning("Nenhuma estatística encontrada para os jogos selecionados após o filtro.")
-            df_final_display = st.session_state.df_processado_com_stats.copy()
+            df_final_display = st.session_state.df_processado_com_stats
             st.session_state.estatisticas_carregadas = False
     else:
-        df_final_display = df_display.copy()
-
-    # Processar DataFrame final para exibição
-    df_final_display = processar_dataframe_para_exibicao(df_final_display)
+        df_final_display = df_display
 
     # Verificar se as colunas processadas existem antes de usá-las
     if 'Gols Casa' not in df_final_display.columns:
-        df_final_display['Gols Casa'] = df_final_display.apply(
-            lambda row: safe_format_odd(row.get('odd_gols_casa')), axis=1
-        )
+        df_final_display['Gols Casa'] = formatar_odds_coluna(df_final_display.get('odd_gols_casa'))
 
     if 'Gols Fora' not in df_final_display.columns:
-        df_final_display['Gols Fora'] = df_final_display.apply(
-            lambda row: safe_format_odd(row.get('odd_gols_fora')), axis=1
-        )
+        df_final_display['Gols Fora'] = formatar_odds_coluna(df_final_display.get('odd_gols_fora'))
 
     # Colunas a serem exibidas na tabela final
     colunas_basicas = [
         'id_jogo', 'horario', 'país', 'liga',
         'escudo_casa', 'Time Casa', 'escudo_fora', 'Time Fora',
         'odd_casa', 'odd_empate', 'odd_fora', 'Gols Casa', 'Gols Fora',
+        *COLUNAS_MELHOR_PRECO.values(),
         'criterio_selecao'
     ]
 
@@ -1596,10 +1871,10 @@ if st.session_state.dados_carregados:
     if st.session_state.estatisticas_carregadas and not df_final_renamed.empty:
         col_export1, col_export2, col_export3 = st.columns([1, 1, 3])
         with col_export1:
-            excel_file = exportar_para_excel(df_final_renamed)
+            # O arquivo só é gerado quando o botão é clicado
             st.download_button(
                 label="📥 Baixar Excel Completo",
-                data=excel_file,
+                data=partial(exportar_para_excel, df_final_renamed),
                 file_name=f"odds_estatisticas_criterios_{data_selecionada.strftime('%Y%m%d')}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 help="Excel com formatação especial para critérios e estatísticas completas"
@@ -1612,26 +1887,29 @@ if st.session_state.dados_carregados:
                     df_final_display['id_jogo'].isin(st.session_state.jogos_selecionados)]
                 colunas_para_mostrar_selecionados = [col for col in colunas_basicas + colunas_estatisticas if
                                                      col in df_selecionados_raw.columns]
-                df_selecionados = df_selecionados_raw[colunas_para_mostrar_selecionados].rename(columns={
-                    'horario': 'Horário',
-                    'país': 'País',
-                    'liga': 'Liga',
-                    'escudo_casa': ' ',
-                    'escudo_fora': '  ',
-                    'odd_casa': 'Odd Casa',
-                    'odd_empate': 'Odd X',
-                    'odd_fora': 'Odd Fora',
-                    'criterio_selecao': 'Critério',
-                    'jogos': 'Jogos (C-F)',
-                    'vitorias': 'Vitórias (C-F)',
-                    'derrotas': 'Derrotas (C-F)',
-                    'gols_marcados': 'Gols Marc. (C-F)',
-                    'gols_sofridos': 'Gols Sofr. (C-F)',
-                    'jogos_sem_marcar': 'J.S.Marcar (C-F)'
-                }).fillna("N/A")
-
-                if not df_selecionados.empty:
-                    excel_selecionados = exportar_para_excel(df_selecionados)
+
+                def excel_selecionados(df_selecionados_raw=df_selecionados_raw,
+                                       colunas=colunas_para_mostrar_selecionados):
+                    """Planilha só com os jogos selecionados, montada no clique do botão"""
+                    return exportar_para_excel(df_selecionados_raw[colunas].rename(columns={
+                        'horario': 'Horário',
+                        'país': 'País',
+                        'liga': 'Liga',
+                        'escudo_casa': ' ',
+                        'escudo_fora': '  ',
+                        'odd_casa': 'Odd Casa',
+                        'odd_empate': 'Odd X',
+                        'odd_fora': 'Odd Fora',
+                        'criterio_selecao': 'Critério',
+                        'jogos': 'Jogos (C-F)',
+                        'vitorias': 'Vitórias (C-F)',
+                        'derrotas': 'Derrotas (C-F)',
+                        'gols_marcados': 'Gols Marc. (C-F)',
+                        'gols_sofridos': 'Gols Sofr. (C-F)',
+                        'jogos_sem_marcar': 'J.S.Marcar (C-F)'
+                    }).fillna("N/A"))
+
+                if not df_selecionados_raw.empty:
                     st.download_button(
                         label="📋 Apenas Selecionados",
                         data=excel_selecionados,
@@ -1640,6 +1918,17 @@ if st.session_state.dados_carregados:
                         help="Excel apenas com jogos selecionados"
                     )
 
+            # Formatos colunares para notebooks: estatísticas numéricas em vez de "casa - fora"
+            formato_analise = st.selectbox("Formato para análise:", list(FORMATOS_EXPORTACAO_ANALISE.keys()))
+            extensao, mime_analise, funcao_exportacao = FORMATOS_EXPORTACAO_ANALISE[formato_analise]
+            st.download_button(
+                label=f"📊 Baixar {formato_analise}",
+                data=partial(funcao_exportacao, df_final_display),
+                file_name=f"odds_estatisticas_{data_selecionada.strftime('%Y%m%d')}.{extensao}",
+                mime=mime_analise,
+                help="Tabela com tipos numéricos (estatísticas separadas por casa e fora) para pandas/notebooks"
+            )
+
         with col_export3:
             # Mostrar estatísticas rápidas
             if 'Critério' in df_final_renamed.columns:
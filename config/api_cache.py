@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+from config.settings import settings
+
+# Tempo de vida (segundos) por endpoint; endpoints fora da tabela não são cacheados
+TTL_POR_ENDPOINT = {
+    '/fixtures': 5 * 60,
+    '/odds': 5 * 60,
+    '/teams/statistics': 12 * 60 * 60,
+    '/teams': 7 * 24 * 60 * 60,
+    '/leagues': 7 * 24 * 60 * 60,
+    '/countries': 30 * 24 * 60 * 60,
+}
+
+
+def normalizar_chave(endpoint: str, params: Optional[dict] = None) -> str:
+    """Gera a chave do cache: endpoint + parâmetros ordenados e convertidos para texto"""
+    endpoint = '/' + endpoint.strip('/')
+    itens = sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None)
+    return endpoint + '?' + '&'.join(f"{k}={v}" for k, v in itens)
+
+
+class ApiCache:
+    """Cache em disco (SQLite) das respostas da API-Football, compartilhado entre UI e scripts
+
+    Cada entrada expira conforme o TTL do endpoint e o arquivo é mantido abaixo de
+    `API_CACHE_MAX_MB` removendo as entradas acessadas há mais tempo (LRU).
+    """
+
+    def __init__(self, caminho: str, max_bytes: int):
+        self.caminho = caminho
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _conexao(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS respostas (
+                    chave TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    conteudo BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    expira_em REAL NOT NULL,
+                    ultimo_acesso REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas(ultimo_acesso)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, endpoint: str, params: Optional[dict] = None) -> Optional[bytes]:
+        """Retorna o corpo JSON (bytes) se houver entrada válida, senão None"""
+        chave = normalizar_chave(endpoint, params)
+        agora = time.time()
+        try:
+            with self._lock:
+                conn = self._conexao()
+                linha = conn.execute(
+                    "SELECT conteudo, expira_em FROM respostas WHERE chave = ?", (chave,)
+                ).fetchone()
+                if linha is None or linha[1] < agora:
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE respostas SET ultimo_acesso = ? WHERE chave = ?", (agora, chave))
+                conn.commit()
+                self.hits += 1
+                return zlib.decompress(linha[0])
+        except sqlite3.Error as e:
+            print(f"Erro ao ler cache da API: {str(e)}")
+            self.misses += 1
+            return None
+
+    def set(self, endpoint: str, params: Optional[dict], conteudo: bytes):
+        """Grava o corpo da resposta se o endpoint tiver TTL configurado"""
+        ttl = ttl_endpoint(endpoint)
+        if not ttl:
+            return
+        chave = normalizar_chave(endpoint, params)
+        comprimido = zlib.compress(conteudo)
+        agora = time.time()
+        try:
+            with self._lock:
+                conn = self._conexao()
+                conn.execute(
+                    "INSERT OR REPLACE INTO respostas (chave, endpoint, conteudo, tamanho, expira_em, ultimo_acesso) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (chave, '/' + endpoint.strip('/'), comprimido, len(comprimido), agora + ttl, agora)
+                )
+                self._evict(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Erro ao gravar cache da API: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Remove entradas expiradas e, se ainda acima do limite, as menos acessadas (LRU)"""
+        conn.execute("DELETE FROM respostas WHERE expira_em < ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        alvo = int(self.max_bytes * 0.9)
+        for chave, tamanho in conn.execute(
+                "SELECT chave, tamanho FROM respostas ORDER BY ultimo_acesso ASC").fetchall():
+            if total <= alvo:
+                break
+            conn.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            total -= tamanho
+
+    def invalidate(self, endpoint: str, params: Optional[dict] = None):
+        """Remove uma entrada específica"""
+        try:
+            with self._lock:
+                conn = self._conexao()
+                conn.execute("DELETE FROM respostas WHERE chave = ?", (normalizar_chave(endpoint, params),))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Erro ao invalidar cache da API: {str(e)}")
+
+    def clear(self):
+        """Esvazia o cache e zera os contadores"""
+        try:
+            with self._lock:
+                conn = self._conexao()
+                conn.execute("DELETE FROM respostas")
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Erro ao limpar cache da API: {str(e)}")
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """Contadores de hit/miss do processo e ocupação atual do arquivo"""
+        entradas, total = 0, 0
+        try:
+            with self._lock:
+                entradas, total = self._conexao().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()
+        except sqlite3.Error:
+            pass
+        consultas = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'taxa_acerto': (self.hits / consultas) if consultas else 0.0,
+            'entradas': entradas,
+            'bytes': total,
+        }
+
+
+def ttl_endpoint(endpoint: str) -> int:
+    """TTL configurado para o endpoint (0 = não cachear)"""
+    return TTL_POR_ENDPOINT.get('/' + endpoint.strip('/'), 0)
+
+
+# Instância global para uso direto
+api_cache = ApiCache(
+    os.path.join(settings.api_cache_dir, 'api_football.sqlite3'),
+    settings.api_cache_max_mb * 1024 * 1024
+)
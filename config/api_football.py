@@ -0,0 +1,89 @@
+import re
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Optional
+
+from config.settings import settings
+from config.rate_limiter import rate_limiter, backoff_delay
+from config.api_cache import api_cache
+
+URL_BASE = "https://v3.football.api-sports.io"
+
+# Corpo de resposta sem erros lógicos ("errors": [])
+SEM_ERROS = re.compile(rb'"errors"\s*:\s*\[\s*\]')
+
+
+class ApiFootball:
+    _session: Optional[requests.Session] = None
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        """Retorna uma sessão HTTP única (keep-alive, gzip e headers da API)"""
+        if cls._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.api_pool_size)
+            session.mount('https://', adapter)
+            session.headers.update({
+                'X-RapidAPI-Key': settings.api_key or '',
+                'X-RapidAPI-Host': 'v3.football.api-sports.io',
+                'Accept-Encoding': 'gzip, deflate'
+            })
+            cls._session = session
+        return cls._session
+
+    @classmethod
+    def reset_session(cls):
+        """Fecha as conexões abertas e descarta a sessão"""
+        if cls._session is not None:
+            cls._session.close()
+        cls._session = None
+
+
+def resposta_do_cache(conteudo: bytes) -> requests.Response:
+    """Monta um Response 200 a partir de um corpo lido do cache em disco"""
+    resposta = requests.Response()
+    resposta.status_code = 200
+    resposta._content = conteudo
+    resposta.encoding = 'utf-8'
+    resposta.headers['Content-Type'] = 'application/json'
+    resposta.headers['X-Cache'] = 'HIT'
+    return resposta
+
+
+def api_get(endpoint: str, params: Optional[dict] = None, timeout: Optional[float] = None,
+            use_cache: bool = True) -> requests.Response:
+    """Faz um GET na API-Football reutilizando a sessão compartilhada
+
+    Respostas 200 dos endpoints com TTL são servidas/gravadas no cache em disco
+    (`use_cache=False` força a ida à API). Toda chamada real passa pelo rate limiter
+    global; respostas 429 e 5xx são repetidas com backoff exponencial e jitter até
+    `API_MAX_RETRIES` vezes.
+    """
+    usar_cache = use_cache and settings.api_cache_enabled
+    if usar_cache:
+        conteudo = api_cache.get(endpoint, params)
+        if conteudo is not None:
+            return resposta_do_cache(conteudo)
+
+    url = f"{URL_BASE}/{endpoint.lstrip('/')}"
+    session = ApiFootball.get_session()
+
+    tentativa = 0
+    while True:
+        rate_limiter.acquire()
+        resposta = session.get(url, params=params, timeout=timeout or settings.api_timeout)
+        rate_limiter.update_from_headers(resposta.headers)
+
+        if resposta.status_code != 429 and resposta.status_code < 500:
+            # A API devolve 200 com "errors" preenchido (ex.: cota esgotada); só cacheia respostas limpas
+            if usar_cache and resposta.status_code == 200 and SEM_ERROS.search(resposta.content):
+                api_cache.set(endpoint, params, resposta.content)
+            return resposta
+        if tentativa >= settings.api_max_retries:
+            return resposta
+
+        if resposta.status_code == 429:
+            rate_limiter.drain()
+        time.sleep(backoff_delay(tentativa, resposta.headers.get('Retry-After')))
+        tentativa += 1
@@ -0,0 +1,113 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Mapping, Optional
+
+from config.settings import settings
+
+
+class CotaDiariaEsgotada(RuntimeError):
+    """A cota diária da API chegou à reserva (`API_DAILY_RESERVE`)"""
+
+
+class RateLimiter:
+    """Token bucket compartilhado pelo processo, ajustado pelos headers da API-Football
+
+    A capacidade começa em `API_REQUESTS_PER_MINUTE` e é corrigida a cada resposta
+    com `X-RateLimit-Limit` / `X-RateLimit-Remaining` (por minuto) e
+    `x-ratelimit-requests-remaining` (cota diária). Quando a cota diária restante
+    chega à reserva, `acquire` recusa novas chamadas até a virada do dia (UTC).
+    """
+
+    def __init__(self, requests_per_minute: int, daily_reserve: int = 0):
+        self._lock = threading.Lock()
+        self.capacity: float = float(max(requests_per_minute, 1))
+        self.tokens: float = self.capacity
+        self._last_refill: float = time.monotonic()
+        self.daily_remaining: Optional[int] = None
+        self.daily_reserve: int = max(daily_reserve, 0)
+        self._daily_day = None
+
+    @property
+    def rate(self) -> float:
+        """Tokens repostos por segundo"""
+        return self.capacity / 60.0
+
+    def _refill(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (agora - self._last_refill) * self.rate)
+        self._last_refill = agora
+
+    def _check_daily(self):
+        """Recusa a chamada se a cota diária chegou à reserva (a contagem zera na virada do dia UTC)"""
+        if self._daily_day != datetime.now(timezone.utc).date():
+            self.daily_remaining = None
+        if self.daily_remaining is not None and self.daily_remaining <= self.daily_reserve:
+            raise CotaDiariaEsgotada(
+                f"Cota diária da API quase esgotada ({self.daily_remaining} restantes, reserva {self.daily_reserve})"
+            )
+
+    def acquire(self):
+        """Bloqueia até haver um token disponível e o consome
+
+        Levanta `CotaDiariaEsgotada` se a cota diária restante chegou à reserva.
+        """
+        while True:
+            with self._lock:
+                self._check_daily()
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    if self.daily_remaining is not None:
+                        # Desconta já, para chamadas simultâneas não passarem da reserva antes da resposta
+                        self.daily_remaining -= 1
+                    return
+                espera = (1 - self.tokens) / self.rate
+            time.sleep(espera)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Sincroniza o bucket com os limites informados pela API"""
+        limite_minuto = _header_int(headers, 'X-RateLimit-Limit')
+        restantes_minuto = _header_int(headers, 'X-RateLimit-Remaining')
+        restantes_dia = _header_int(headers, 'x-ratelimit-requests-remaining')
+
+        with self._lock:
+            self._refill()
+            if limite_minuto:
+                self.capacity = float(limite_minuto)
+            if restantes_minuto is not None:
+                # A API é a fonte da verdade: nunca gastar mais do que ela diz que resta
+                self.tokens = min(self.tokens, float(restantes_minuto))
+            if restantes_dia is not None:
+                self.daily_remaining = restantes_dia
+                self._daily_day = datetime.now(timezone.utc).date()
+
+    def drain(self):
+        """Esvazia o bucket (usado ao receber 429) para que todos os chamadores esperem"""
+        with self._lock:
+            self._refill()
+            self.tokens = 0.0
+
+
+def _header_int(headers: Mapping[str, str], nome: str) -> Optional[int]:
+    valor = headers.get(nome)
+    try:
+        return int(valor) if valor is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(tentativa: int, retry_after: Optional[str] = None) -> float:
+    """Tempo de espera com backoff exponencial e jitter (respeita Retry-After)"""
+    if retry_after:
+        try:
+            return float(retry_after) + random.uniform(0, 1)
+        except ValueError:
+            pass
+    teto = min(settings.api_backoff_max, settings.api_backoff_base * (2 ** tentativa))
+    return random.uniform(teto / 2, teto)
+
+
+# Instância global para uso direto
+rate_limiter = RateLimiter(settings.api_requests_per_minute, settings.api_daily_reserve)
@@ -21,6 +21,48 @@ class Settings:
 
         self.debug: bool = os.getenv("DEBUG", "False").lower() == "true"
 
+        # Cliente HTTP da API-Football (pool de conexões e timeouts)
+        self.api_timeout: float = float(os.getenv("API_TIMEOUT", "30"))
+        self.api_pool_size: int = int(os.getenv("API_POOL_SIZE", "10"))
+
+        # Concorrência e limite do plano da conta (requisições por minuto)
+        self.api_max_workers: int = int(os.getenv("API_MAX_WORKERS", "5"))
+        self.api_requests_per_minute: int = int(os.getenv("API_REQUESTS_PER_MINUTE", "300"))
+
+        # Requisições da cota diária guardadas como reserva: abaixo disso as chamadas são recusadas
+        self.api_daily_reserve: int = int(os.getenv("API_DAILY_RESERVE", "20"))
+
+        # Novas tentativas em 429/5xx (backoff exponencial com jitter, em segundos)
+        self.api_max_retries: int = int(os.getenv("API_MAX_RETRIES", "4"))
+        self.api_backoff_base: float = float(os.getenv("API_BACKOFF_BASE", "1"))
+        self.api_backoff_max: float = float(os.getenv("API_BACKOFF_MAX", "30"))
+
+        # Cache em disco das respostas da API (compartilhado entre app e scripts)
+        self.api_cache_enabled: bool = os.getenv("API_CACHE_ENABLED", "True").lower() == "true"
+        self.api_cache_dir: str = os.getenv(
+            "API_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+        )
+        self.api_cache_max_mb: int = int(os.getenv("API_CACHE_MAX_MB", "200"))
+
+        # Idade máxima (dias) de uma linha de estatisticas_times antes de ser atualizada
+        self.stats_max_age_days: int = int(os.getenv("STATS_MAX_AGE_DAYS", "7"))
+
+        # Histórico de odds (capturas em Parquet particionadas por data; não pode ser baixado de novo)
+        self.odds_history_enabled: bool = os.getenv("ODDS_HISTORY_ENABLED", "True").lower() == "true"
+        self.odds_history_dir: str = os.getenv(
+            "ODDS_HISTORY_DIR",
+            os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dados", "historico_odds")
+        )
+
+        # Atualização incremental de odds: jogos que começam dentro da janela ou verificados há mais tempo
+        self.odds_refresh_window_minutes: int = int(os.getenv("ODDS_REFRESH_WINDOW_MINUTES", "120"))
+        self.odds_max_age_minutes: int = int(os.getenv("ODDS_MAX_AGE_MINUTES", "60"))
+
+        # Arquivo JSON com as regras de seleção automática de jogos
+        self.selection_rules_file: str = os.getenv(
+            "SELECTION_RULES_FILE", os.path.join(os.path.dirname(__file__), "regras_selecao.json")
+        )
+
     def validate(self):
         if not self.api_key:
             raise ValueError("API_KEY não configurada. Verifique as variáveis de ambiente ou secrets do Streamlit.")
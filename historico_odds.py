@@ -0,0 +1,168 @@
+import os
+import threading
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from config.settings import settings
+
+# Identifica uma cotação: o mesmo mercado/seleção/linha de um bookmaker em um jogo
+CHAVES_COTACAO = ['fixture_id', 'bookmaker_id', 'bet_id', 'label', 'line']
+
+# Esquema fixo dos arquivos de captura (igual ao da tabela longa + momento da captura)
+ESQUEMA_CAPTURA = pa.schema([
+    ('fixture_id', pa.int64()),
+    ('bookmaker_id', pa.int16()),
+    ('bet_id', pa.int16()),
+    ('label', pa.string()),
+    ('line', pa.float32()),
+    ('odd', pa.float64()),
+    ('capturado_em', pa.timestamp('us', tz='UTC')),
+])
+
+
+class HistoricoOdds:
+    """Histórico append-only das odds em Parquet, particionado por data (`data=AAAA-MM-DD/`)
+
+    Cada busca de odds vira um arquivo de captura com o instante em `capturado_em`.
+    Só as cotações que mudaram desde a captura anterior são gravadas, então a
+    abertura é a primeira linha de cada cotação, a atual é a última e a curva de
+    movimento são todas as linhas dela em ordem de captura.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.lock = threading.Lock()
+        # data -> (arquivos já lidos, última odd de cada cotação)
+        self.estados = {}
+
+    def diretorio_data(self, data):
+        return os.path.join(self.diretorio, f"data={data}")
+
+    def arquivos(self, data):
+        """Arquivos de captura da data, em ordem de gravação"""
+        diretorio = self.diretorio_data(data)
+        if not os.path.isdir(diretorio):
+            return []
+        return sorted(os.path.join(diretorio, nome) for nome in os.listdir(diretorio) if nome.endswith('.parquet'))
+
+    def ler(self, arquivos, filtro=None):
+        """Lê as capturas dos arquivos como DataFrame (vazio, com as colunas certas, se não houver)"""
+        if not arquivos:
+            return ESQUEMA_CAPTURA.empty_table().to_pandas()
+        return ds.dataset(arquivos, schema=ESQUEMA_CAPTURA, format='parquet').to_table(filter=filtro).to_pandas()
+
+    def estado_atual(self, data):
+        """Última odd conhecida de cada cotação da data (lê só os arquivos novos desde a última vez)"""
+        lidos, estado = self.estados.get(data, (set(), None))
+        novos = [arquivo for arquivo in self.arquivos(data) if arquivo not in lidos]
+
+        if novos or estado is None:
+            partes = [parte for parte in (estado, self.ler(novos)) if parte is not None and not parte.empty]
+            estado = pd.concat(partes, ignore_index=True) if partes else self.ler([])
+            estado = (estado.sort_values('capturado_em', kind='stable')
+                      .drop_duplicates(CHAVES_COTACAO, keep='last')
+                      .reset_index(drop=True))
+            self.estados[data] = (lidos | set(novos), estado)
+
+        return estado
+
+    def salvar_captura(self, data, tabela_odds, capturado_em=None):
+        """Grava as cotações de `tabela_odds` que mudaram desde a última captura da data
+
+        Retorna o número de linhas gravadas (0 se nada mudou).
+        """
+        if tabela_odds is None or tabela_odds.empty:
+            return 0
+
+        capturado_em = capturado_em or pd.Timestamp.now(tz='UTC')
+        captura = tabela_odds[CHAVES_COTACAO + ['odd']].astype({'label': str})
+
+        with self.lock:
+            anterior = self.estado_atual(data)[CHAVES_COTACAO + ['odd']]
+            comparacao = captura.merge(anterior, on=CHAVES_COTACAO, how='left', suffixes=('', '_anterior'))
+            mudou = comparacao[comparacao['odd'] != comparacao['odd_anterior']]
+            if mudou.empty:
+                return 0
+
+            mudou = mudou[CHAVES_COTACAO + ['odd']].assign(capturado_em=capturado_em)
+            tabela = pa.Table.from_pandas(mudou, schema=ESQUEMA_CAPTURA, preserve_index=False)
+
+            diretorio = self.diretorio_data(data)
+            os.makedirs(diretorio, exist_ok=True)
+            nome = f"{capturado_em:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}.parquet"
+            temporario = os.path.join(diretorio, f".{nome}.tmp")
+            pq.write_table(tabela, temporario, compression='zstd')
+            os.replace(temporario, os.path.join(diretorio, nome))
+
+            # Atualiza o estado em memória sem reler o arquivo recém-gravado
+            lidos, estado = self.estados[data]
+            estado = (pd.concat([estado, mudou], ignore_index=True)
+                      .drop_duplicates(CHAVES_COTACAO, keep='last')
+                      .reset_index(drop=True))
+            self.estados[data] = (lidos | {os.path.join(diretorio, nome)}, estado)
+
+        return len(mudou)
+
+    def carregar(self, data, fixture_ids=None, bet_id=None, bookmaker_id=None):
+        """Todas as capturas da data, filtradas por jogos, aposta e bookmaker"""
+        filtro = None
+        for condicao in (
+            ds.field('fixture_id').isin(list(fixture_ids)) if fixture_ids is not None else None,
+            ds.field('bet_id') == bet_id if bet_id is not None else None,
+            ds.field('bookmaker_id') == bookmaker_id if bookmaker_id is not None else None,
+        ):
+            if condicao is not None:
+                filtro = condicao if filtro is None else filtro & condicao
+
+        return self.ler(self.arquivos(data), filtro).sort_values('capturado_em', kind='stable').reset_index(drop=True)
+
+    def abertura_e_atual(self, data, fixture_ids=None, bet_id=None, bookmaker_id=None):
+        """Odd de abertura, odd atual e variação de cada cotação
+
+        Colunas: chaves da cotação, odd_abertura, odd_atual, variacao, variacao_pct,
+        capturas (quantas vezes a odd mudou, contando a abertura), aberta_em e atualizada_em.
+        """
+        historico = self.carregar(data, fixture_ids, bet_id, bookmaker_id)
+        agrupado = historico.groupby(CHAVES_COTACAO, sort=False, dropna=False)
+
+        resumo = agrupado.agg(
+            odd_abertura=('odd', 'first'),
+            odd_atual=('odd', 'last'),
+            capturas=('odd', 'size'),
+            aberta_em=('capturado_em', 'first'),
+            atualizada_em=('capturado_em', 'last'),
+        ).reset_index()
+        resumo['variacao'] = resumo['odd_atual'] - resumo['odd_abertura']
+        resumo['variacao_pct'] = resumo['variacao'] / resumo['odd_abertura'] * 100
+        return resumo
+
+    def curva_movimento(self, data, fixture_id, bet_id, label=None, line=None, bookmaker_id=None):
+        """Série (capturado_em, odd) de um mercado de um jogo, uma coluna por seleção/bookmaker"""
+        historico = self.carregar(data, [fixture_id], bet_id, bookmaker_id)
+        if label is not None:
+            historico = historico[historico['label'] == label]
+        if line is not None:
+            historico = historico[historico['line'] == line]
+
+        selecao = historico['label'] + historico['line'].map(lambda valor: '' if pd.isna(valor) else f' {valor:g}')
+        curva = historico.assign(selecao=selecao + ' @' + historico['bookmaker_id'].astype(str))
+        return (curva.pivot_table(index='capturado_em', columns='selecao', values='odd', aggfunc='last')
+                .sort_index()
+                .ffill())
+
+
+historico_odds = HistoricoOdds(settings.odds_history_dir)
+
+
+def registrar_captura_odds(data, tabela_odds):
+    """Guarda a busca de odds no histórico, sem interromper a aplicação em caso de erro"""
+    if not settings.odds_history_enabled:
+        return 0
+    try:
+        return historico_odds.salvar_captura(data, tabela_odds)
+    except Exception as e:
+        print(f"Erro ao gravar histórico de odds de {data}: {str(e)}")
+        return 0
@@ -0,0 +1,330 @@
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from config.database import supabase
+from config.settings import settings
+from config.api_football import api_get
+
+# Status em que o placar do jogo é gravado (finalizado ou suspenso)
+STATUS_COM_PLACAR = ['FT', 'AET', 'PEN', 'SUSP', 'INT']
+
+# Ids de ligas e times que já se sabe existirem no banco; em processos longos (o app)
+# evitam repetir as consultas de existência a cada gravação
+ligas_conhecidas = set()
+times_conhecidos = set()
+
+
+def buscar_ids_existentes(tabela, ids, tamanho_lote=500):
+    """Retorna quais dos ids informados já existem na tabela (consultas em lote com in_)"""
+    ids = sorted(set(ids))
+    existentes = set()
+
+    for inicio in range(0, len(ids), tamanho_lote):
+        try:
+            resultado = supabase.table(tabela).select("id").in_('id', ids[inicio:inicio + tamanho_lote]).execute()
+            existentes.update(linha['id'] for linha in resultado.data)
+        except Exception as e:
+            print(f"❌ Erro ao buscar ids existentes em {tabela}: {str(e)}")
+
+    return existentes
+
+
+def consultar_por_ids(tabela, colunas, ids, tamanho_lote=500):
+    """{id: linha} da tabela para os ids informados (consultas em lote com in_; erros sobem)"""
+    ids = sorted(set(ids))
+    linhas = {}
+    for inicio in range(0, len(ids), tamanho_lote):
+        resultado = supabase.table(tabela).select(colunas).in_('id', ids[inicio:inicio + tamanho_lote]).execute()
+        linhas.update((linha['id'], linha) for linha in resultado.data)
+    return linhas
+
+
+def inserir_em_lote(tabela, registros, tamanho_lote=300):
+    """Insere vários registros de uma vez (ids que já existirem são ignorados)
+
+    Se um lote falhar, tenta registro a registro para que uma linha ruim não derrube
+    as demais. Retorna (ids gravados ou já existentes, ids realmente inseridos).
+    """
+    gravados = set()
+    inseridos = set()
+
+    def inserir(linhas):
+        # ignore_duplicates: o registro pode ter sido criado por outro processo nesse meio tempo;
+        # a resposta só traz as linhas efetivamente inseridas
+        resultado = supabase.table(tabela).upsert(linhas, ignore_duplicates=True).execute()
+        gravados.update(registro['id'] for registro in linhas)
+        inseridos.update(linha['id'] for linha in resultado.data or [])
+
+    for inicio in range(0, len(registros), tamanho_lote):
+        lote = registros[inicio:inicio + tamanho_lote]
+        try:
+            inserir(lote)
+        except Exception as e:
+            print(f"   ⚠️ Erro no lote de {tabela} ({str(e)}). Gravando individualmente...")
+            for registro in lote:
+                try:
+                    inserir([registro])
+                except Exception as e_registro:
+                    print(f"   ❌ Erro ao salvar {tabela} {registro['id']}: {str(e_registro)}")
+
+    return gravados, inseridos
+
+
+def buscar_time_api(time_id):
+    """Busca informações de um time específico na API"""
+    parametros = {
+        'id': time_id
+    }
+
+    try:
+        resposta = api_get('/teams', params=parametros)
+        if resposta.status_code == 200:
+            dados = resposta.json()
+            times = dados.get('response', [])
+            if times:
+                return times[0]  # Retorna o primeiro (e único) time
+        return None
+    except Exception as e:
+        print(f"❌ Erro ao buscar time {time_id} da API: {str(e)}")
+        return None
+
+
+def buscar_times_api_em_paralelo(times_ids):
+    """Busca vários times na API em paralelo (ids repetidos são buscados uma única vez)
+
+    O ritmo das requisições é controlado pelo rate limiter de api_get.
+    Retorna {time_id: dados_da_api} apenas para os times encontrados.
+    """
+    ids = sorted(set(times_ids))
+    encontrados = {}
+    if not ids:
+        return encontrados
+
+    print(f"   🔄 Buscando {len(ids)} times na API...")
+    with ThreadPoolExecutor(max_workers=settings.api_max_workers) as executor:
+        for time_id, time_data in zip(ids, executor.map(buscar_time_api, ids)):
+            if time_data:
+                encontrados[time_id] = time_data
+
+    return encontrados
+
+
+def montar_dados_time(time_info):
+    """Converte um time (`team` de /teams ou `teams.home/away` do fixture) no formato da tabela times"""
+    return {
+        'id': time_info.get('id'),
+        'nome': time_info.get('name'),
+        'codigo': time_info.get('code'),
+        'logo_url': time_info.get('logo'),
+        'ano_fundacao': time_info.get('founded'),
+        'ativo': True,
+        'atualizado_em': datetime.now().isoformat()
+    }
+
+
+def montar_dados_liga(league_data, pais_id=None):
+    """Converte uma liga da API no formato da tabela ligas"""
+    return {
+        'id': league_data.get('id'),
+        'nome': league_data.get('name'),
+        'tipo': league_data.get('type'),
+        'logo_url': league_data.get('logo'),
+        'pais_id': pais_id,
+        'ativo': True,
+        'atualizado_em': datetime.now().isoformat()
+    }
+
+
+def salvar_times_em_lote(times_info, tamanho_lote=300):
+    """Insere vários times de uma vez (ids que já existirem são ignorados)
+
+    Retorna (ids gravados ou já existentes, ids novos).
+    """
+    gravados, novos = inserir_em_lote('times', [montar_dados_time(time_info) for time_info in times_info],
+                                      tamanho_lote)
+    if novos:
+        print(f"   ✅ {len(novos)} times salvos no banco")
+    return gravados, novos
+
+
+def salvar_ligas_em_lote(ligas, tamanho_lote=300):
+    """Insere várias ligas de uma vez a partir dos dados do fixture
+
+    `ligas` é {liga_id: league_data}; os países são resolvidos numa única consulta.
+    Retorna (ids gravados ou já existentes, ids novos).
+    """
+    nomes_paises = sorted({league.get('country') for league in ligas.values()
+                           if league.get('country') and league.get('country') != "World"})
+    paises = {}
+    if nomes_paises:
+        try:
+            resultado = supabase.table('paises').select("id, nome").in_('nome', nomes_paises).execute()
+            paises = {pais['nome']: pais['id'] for pais in resultado.data}
+        except Exception as e:
+            print(f"   ❌ Erro ao buscar países: {str(e)}")
+
+    registros = [montar_dados_liga(league, paises.get(league.get('country'))) for league in ligas.values()]
+    gravadas, novas = inserir_em_lote('ligas', registros, tamanho_lote)
+    if novas:
+        print(f"   ✅ {len(novas)} ligas salvas no banco")
+    return gravadas, novas
+
+
+def montar_dados_jogo(jogo, data_busca):
+    """Converte um fixture da API no formato da tabela jogos"""
+    fixture = jogo['fixture']
+    teams = jogo['teams']
+    league = jogo['league']
+    venue = fixture.get('venue') or {}
+    score = jogo.get('score') or {}
+
+    status_short = fixture.get('status', {}).get('short', 'NS')
+
+    # Extrair gols se o jogo já foi jogado
+    gols_casa = None
+    gols_fora = None
+    if status_short in STATUS_COM_PLACAR:
+        gols_casa = (score.get('fulltime') or {}).get('home')
+        gols_fora = (score.get('fulltime') or {}).get('away')
+        # Se não tiver fulltime, tentar halftime
+        if gols_casa is None:
+            gols_casa = (score.get('halftime') or {}).get('home')
+            gols_fora = (score.get('halftime') or {}).get('away')
+
+    return {
+        'id': fixture['id'],
+        'data': data_busca,
+        'horario': fixture['date'],
+        'time_casa_id': teams['home']['id'],
+        'time_fora_id': teams['away']['id'],
+        'liga_id': league['id'],
+        'temporada': league['season'],
+        'status': status_short,
+        'rodada': league.get('round'),
+        'arbitro': fixture.get('referee'),
+        'estadio': venue.get('name'),
+        'cidade': venue.get('city'),
+        'gols_casa': gols_casa,
+        'gols_fora': gols_fora,
+        'atualizado_em': datetime.now().isoformat()
+    }
+
+
+def upsert_jogos_em_lote(lista_jogos, tamanho_lote=300):
+    """Grava jogos com upsert em lotes; se um lote falhar, tenta jogo a jogo para isolar o erro
+
+    Retorna (gravados, com_erro).
+    """
+    gravados = 0
+    com_erro = 0
+
+    for inicio in range(0, len(lista_jogos), tamanho_lote):
+        lote = lista_jogos[inicio:inicio + tamanho_lote]
+        try:
+            supabase.table('jogos').upsert(lote).execute()
+            gravados += len(lote)
+        except Exception as e:
+            print(f"   ⚠️ Erro no lote de jogos ({str(e)}). Gravando individualmente...")
+            for dados_jogo in lote:
+                try:
+                    supabase.table('jogos').upsert(dados_jogo).execute()
+                    gravados += 1
+                except Exception as e_jogo:
+                    print(f"❌ Erro ao salvar jogo {dados_jogo['id']}: {str(e_jogo)}")
+                    com_erro += 1
+
+        print(f"   📊 Progresso: {min(inicio + tamanho_lote, len(lista_jogos))}/{len(lista_jogos)} jogos gravados")
+
+    return gravados, com_erro
+
+
+def marcar_data_sincronizada(data_busca, total_jogos):
+    """Registra em datas_sincronizadas que todos os jogos da data foram gravados"""
+    try:
+        supabase.table('datas_sincronizadas').upsert({
+            'data': data_busca,
+            'total_jogos': total_jogos,
+            'sincronizado_em': datetime.now().isoformat()
+        }).execute()
+        return True
+    except Exception as e:
+        print(f"❌ Erro ao marcar a data {data_busca} como sincronizada: {str(e)}")
+        return False
+
+
+def salvar_jogos_banco(jogos, data_busca):
+    """Salva os jogos no banco de dados
+
+    Pipeline em lote: consulta quais ligas, times e jogos já existem (só os ids
+    ainda não conhecidos no processo), cria as ligas e times ausentes em lote (times
+    buscados em paralelo na API; os que ela não devolver usam os dados do próprio
+    fixture) e grava os jogos com upserts em lotes. Só quando nenhum jogo falha a
+    data é marcada como sincronizada.
+    Retorna (salvos, atualizados, com_erro, times_novos, ligas_novas).
+    """
+    jogos_com_erro = 0
+    times_novos = 0
+    ligas_novas = 0
+
+    print(f"\n📝 Processando {len(jogos)} jogos...")
+
+    # Ids conhecidos no banco (poucas consultas em lote em vez de várias por jogo)
+    ligas_jogos = {jogo['league']['id']: jogo['league'] for jogo in jogos}
+    times_jogos = {jogo['teams'][lado]['id']: jogo['teams'][lado] for jogo in jogos for lado in ('home', 'away')}
+    ligas_conhecidas.update(buscar_ids_existentes('ligas', ligas_jogos.keys() - ligas_conhecidas))
+    times_conhecidos.update(buscar_ids_existentes('times', times_jogos.keys() - times_conhecidos))
+    jogos_existentes = buscar_ids_existentes('jogos', [jogo['fixture']['id'] for jogo in jogos])
+
+    # Coletar todas as ligas e times ausentes antes de gravar qualquer jogo
+    ligas_ausentes = {liga_id: league for liga_id, league in ligas_jogos.items() if liga_id not in ligas_conhecidas}
+    times_ausentes = times_jogos.keys() - times_conhecidos
+
+    if ligas_ausentes:
+        print(f"\n   📋 {len(ligas_ausentes)} ligas não encontradas. Criando...")
+        ligas_salvas, ids_ligas_novas = salvar_ligas_em_lote(ligas_ausentes)
+        ligas_novas = len(ids_ligas_novas)
+        ligas_conhecidas.update(ligas_salvas)
+
+    if times_ausentes:
+        print(f"\n   ⚠️ {len(times_ausentes)} times não encontrados no banco.")
+        times_api = buscar_times_api_em_paralelo(times_ausentes)
+        times_info = [times_api[time_id]['team'] if time_id in times_api else times_jogos[time_id]
+                      for time_id in sorted(times_ausentes)]
+        times_salvos, ids_times_novos = salvar_times_em_lote(times_info)
+        times_novos = len(ids_times_novos)
+        times_conhecidos.update(times_salvos)
+
+    # Montar os registros, pulando jogos cujas dependências não puderam ser criadas
+    lista_jogos = []
+    for jogo in jogos:
+        fixture_id = jogo.get('fixture', {}).get('id')
+        try:
+            dados_jogo = montar_dados_jogo(jogo, data_busca)
+        except Exception as e:
+            print(f"❌ Erro ao processar jogo {fixture_id}: {str(e)}")
+            jogos_com_erro += 1
+            continue
+
+        if dados_jogo['liga_id'] not in ligas_conhecidas:
+            print(f"   ❌ Pulando jogo {fixture_id} - Liga não encontrada")
+            jogos_com_erro += 1
+        elif dados_jogo['time_casa_id'] not in times_conhecidos:
+            print(f"   ❌ Pulando jogo {fixture_id} - Time casa não encontrado")
+            jogos_com_erro += 1
+        elif dados_jogo['time_fora_id'] not in times_conhecidos:
+            print(f"   ❌ Pulando jogo {fixture_id} - Time fora não encontrado")
+            jogos_com_erro += 1
+        else:
+            lista_jogos.append(dados_jogo)
+
+    # Gravar com upsert em lotes
+    _, erros_gravacao = upsert_jogos_em_lote(lista_jogos)
+    jogos_com_erro += erros_gravacao
+
+    if jogos_com_erro == 0:
+        marcar_data_sincronizada(data_busca, len(lista_jogos))
+
+    jogos_atualizados = sum(1 for dados_jogo in lista_jogos if dados_jogo['id'] in jogos_existentes)
+    jogos_salvos = max(len(lista_jogos) - jogos_atualizados - erros_gravacao, 0)
+
+    return jogos_salvos, jogos_atualizados, jogos_com_erro, times_novos, ligas_novas
@@ -0,0 +1,183 @@
+import json
+import operator
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from tabela_odds import ID_APOSTA_RESULTADO, ID_APOSTA_GOLS_CASA, ID_APOSTA_GOLS_FORA
+
+# Mercados que podem ser usados nas regras: nome -> (bet_id, label) da tabela de odds
+MERCADOS = {
+    'vitoria_casa': (ID_APOSTA_RESULTADO, 'Home'),
+    'empate': (ID_APOSTA_RESULTADO, 'Draw'),
+    'vitoria_fora': (ID_APOSTA_RESULTADO, 'Away'),
+    'gols_jogo_over': (5, 'Over'),  # Goals Over/Under
+    'gols_jogo_under': (5, 'Under'),
+    'ambos_marcam_sim': (8, 'Yes'),  # Both Teams Score
+    'ambos_marcam_nao': (8, 'No'),
+    'gols_casa_over': (ID_APOSTA_GOLS_CASA, 'Over'),
+    'gols_casa_under': (ID_APOSTA_GOLS_CASA, 'Under'),
+    'gols_fora_over': (ID_APOSTA_GOLS_FORA, 'Over'),
+    'gols_fora_under': (ID_APOSTA_GOLS_FORA, 'Under'),
+}
+
+# Texto de cada mercado na legenda da interface
+NOMES_MERCADOS = {
+    'vitoria_casa': 'Casa',
+    'empate': 'Empate',
+    'vitoria_fora': 'Fora',
+    'gols_jogo_over': 'Jogo mais de',
+    'gols_jogo_under': 'Jogo menos de',
+    'ambos_marcam_sim': 'Ambos marcam',
+    'ambos_marcam_nao': 'Ambos não marcam',
+    'gols_casa_over': 'Casa marca',
+    'gols_casa_under': 'Casa menos de',
+    'gols_fora_over': 'Fora marca',
+    'gols_fora_under': 'Fora menos de',
+}
+
+COMPARADORES = {
+    '>=': (operator.ge, '≥'),
+    '>': (operator.gt, '>'),
+    '<=': (operator.le, '≤'),
+    '<': (operator.lt, '<'),
+    '==': (operator.eq, '='),
+    '!=': (operator.ne, '≠'),
+}
+
+
+def compilar_condicao(condicao):
+    """Valida uma condição (cláusula ou grupo todos/algum) e a converte numa árvore de tuplas
+
+    - cláusula: {"mercado", "linha" (opcional), "comparador", "limite"}
+    - grupo E: {"todos": [...]}; grupo OU: {"algum": [...]}
+    """
+    if not isinstance(condicao, dict):
+        raise ValueError(f"Condição inválida: {condicao!r}")
+
+    for tipo in ('todos', 'algum'):
+        if tipo in condicao:
+            filhas = condicao[tipo]
+            if not isinstance(filhas, list) or not filhas:
+                raise ValueError(f"'{tipo}' precisa de uma lista não vazia de condições")
+            return (tipo, [compilar_condicao(filha) for filha in filhas])
+
+    mercado = condicao.get('mercado')
+    if mercado not in MERCADOS:
+        raise ValueError(f"Mercado desconhecido: {mercado!r}. Opções: {', '.join(MERCADOS)}")
+    comparador = condicao.get('comparador', '>=')
+    if comparador not in COMPARADORES:
+        raise ValueError(f"Comparador inválido: {comparador!r}. Opções: {', '.join(COMPARADORES)}")
+    try:
+        limite = float(condicao['limite'])
+        linha = float(condicao['linha']) if condicao.get('linha') is not None else None
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Cláusula com limite/linha inválidos: {condicao!r}")
+
+    return ('clausula', mercado, linha, comparador, limite)
+
+
+def descrever_condicao(arvore, raiz=True):
+    """Texto legível de uma condição compilada (usado na legenda da interface)"""
+    if arvore[0] == 'clausula':
+        _, mercado, linha, comparador, limite = arvore
+        texto_linha = f"({linha:g})" if linha is not None else ''
+        return f"{NOMES_MERCADOS[mercado]}{texto_linha} {COMPARADORES[comparador][1]}{limite:g}"
+
+    conector = ' E ' if arvore[0] == 'todos' else ' OU '
+    texto = conector.join(descrever_condicao(filha, raiz=False) for filha in arvore[1])
+    return texto if raiz else f"({texto})"
+
+
+class RegrasSelecao:
+    """Conjunto de regras de seleção compilado uma vez e avaliado de forma vetorizada
+
+    Cada regra tem `nome` (o critério exibido), `prioridade` (menor vence) e
+    `condicao`. A avaliação monta uma coluna de odds por (mercado, linha) usado nas
+    regras e aplica as cláusulas como máscaras booleanas sobre todos os jogos.
+    """
+
+    def __init__(self, regras):
+        if not isinstance(regras, list) or not regras:
+            raise ValueError("As regras devem ser uma lista não vazia")
+
+        compiladas = []
+        for posicao, regra in enumerate(regras):
+            if not isinstance(regra, dict) or not regra.get('nome'):
+                raise ValueError(f"Regra {posicao + 1} sem 'nome'")
+            if 'condicao' not in regra:
+                raise ValueError(f"Regra '{regra['nome']}' sem 'condicao'")
+            compiladas.append((regra.get('prioridade', posicao + 1), posicao, str(regra['nome']),
+                               compilar_condicao(regra['condicao'])))
+
+        compiladas.sort()
+        self.regras = [(nome, arvore) for _, _, nome, arvore in compiladas]
+        self.chaves = set()
+        for _, arvore in self.regras:
+            self._coletar_chaves(arvore)
+
+    def _coletar_chaves(self, arvore):
+        if arvore[0] == 'clausula':
+            self.chaves.add((arvore[1], arvore[2]))
+        else:
+            for filha in arvore[1]:
+                self._coletar_chaves(filha)
+
+    def montar_colunas(self, tabela_odds, id_bookmaker=None):
+        """Uma coluna de odd por (mercado, linha) usado nas regras, indexada por fixture_id"""
+        if id_bookmaker is not None:
+            tabela_odds = tabela_odds[tabela_odds['bookmaker_id'] == id_bookmaker]
+
+        ids_apostas = {MERCADOS[mercado][0] for mercado, _ in self.chaves}
+        tabela = tabela_odds[tabela_odds['bet_id'].isin(ids_apostas)]
+        indice = pd.Index(tabela_odds['fixture_id'].unique(), name='fixture_id')
+
+        colunas = {}
+        for mercado, linha in self.chaves:
+            bet_id, label = MERCADOS[mercado]
+            filtro = (tabela['bet_id'] == bet_id) & (tabela['label'] == label)
+            filtro &= tabela['line'].isna() if linha is None else (tabela['line'] == linha)
+            linhas = tabela[filtro].drop_duplicates('fixture_id')
+            colunas[(mercado, linha)] = pd.Series(linhas['odd'].to_numpy(), index=linhas['fixture_id'].to_numpy())
+
+        return pd.DataFrame({chave: serie.reindex(indice) for chave, serie in colunas.items()}, index=indice)
+
+    def _mascara(self, arvore, colunas):
+        if arvore[0] == 'clausula':
+            _, mercado, linha, comparador, limite = arvore
+            odds = colunas[(mercado, linha)]
+            return COMPARADORES[comparador][0](odds, limite) & odds.notna()
+
+        mascaras = [self._mascara(filha, colunas) for filha in arvore[1]]
+        combinada = mascaras[0]
+        for mascara in mascaras[1:]:
+            combinada = (combinada & mascara) if arvore[0] == 'todos' else (combinada | mascara)
+        return combinada
+
+    def avaliar(self, tabela_odds, id_bookmaker=None):
+        """Critério atendido por jogo (nome da regra de maior prioridade, ou '')"""
+        colunas = self.montar_colunas(tabela_odds, id_bookmaker)
+        if colunas.empty:
+            return pd.Series([], dtype=object, index=colunas.index)
+
+        mascaras = [self._mascara(arvore, colunas).to_numpy() for _, arvore in self.regras]
+        nomes = [nome for nome, _ in self.regras]
+        return pd.Series(np.select(mascaras, nomes, default=''), index=colunas.index, dtype=object)
+
+    def descrever(self):
+        """Lista de (nome, descrição) na ordem de prioridade, para a legenda da interface"""
+        return [(nome, descrever_condicao(arvore)) for nome, arvore in self.regras]
+
+
+def carregar_regras(caminho=None):
+    """Lê e compila as regras do arquivo JSON (padrão: SELECTION_RULES_FILE)"""
+    with open(caminho or settings.selection_rules_file, encoding='utf-8') as arquivo:
+        return RegrasSelecao(json.load(arquivo))
+
+
+def regras_de_texto(texto):
+    """Compila regras a partir de um texto JSON (editor da barra lateral)"""
+    try:
+        return RegrasSelecao(json.loads(texto))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON inválido: {str(e)}")
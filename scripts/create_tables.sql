@@ -75,6 +75,13 @@ CREATE TABLE IF NOT EXISTS jogos (
 -- Índice para busca rápida por data
 CREATE INDEX IF NOT EXISTS idx_jogos_data ON jogos(data);
 
+-- Datas cujos jogos foram gravados por completo (marcadas só depois da gravação terminar sem erros)
+CREATE TABLE IF NOT EXISTS datas_sincronizadas (
+    data DATE PRIMARY KEY,
+    total_jogos INTEGER NOT NULL,
+    sincronizado_em TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW()
+);
+
 -- Tabela de estatísticas dos times
 CREATE TABLE IF NOT EXISTS estatisticas_times (
     id SERIAL PRIMARY KEY,
@@ -2,24 +2,15 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import requests
 from datetime import datetime
 from config.database import supabase
-from config.settings import settings
-
-# Headers para requisições
-cabecalhos = {
-    'X-RapidAPI-Key': settings.api_key,
-    'X-RapidAPI-Host': 'v3.football.api-sports.io'
-}
+from config.api_football import api_get
 
 def buscar_paises_api():
     """Busca todos os países da API"""
-    url = "https://v3.football.api-sports.io/countries"
-    
     try:
         print("🔄 Buscando países da API...")
-        resposta = requests.get(url, headers=cabecalhos)
+        resposta = api_get('/countries')
         
         if resposta.status_code == 200:
             dados = resposta.json()
@@ -2,17 +2,9 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import requests
-import time
 from datetime import datetime
 from config.database import supabase
-from config.settings import settings
-
-# Headers para requisições
-cabecalhos = {
-    'X-RapidAPI-Key': settings.api_key,
-    'X-RapidAPI-Host': 'v3.football.api-sports.io'
-}
+from config.api_football import api_get
 
 def buscar_ligas_ativas():
     """Busca todas as ligas ativas com temporada atual"""
@@ -28,14 +20,13 @@ def buscar_ligas_ativas():
 
 def buscar_times_liga_api(liga_id, temporada):
     """Busca todos os times de uma liga específica na temporada atual"""
-    url = "https://v3.football.api-sports.io/teams"
     parametros = {
         'league': liga_id,
         'season': temporada
     }
     
     try:
-        resposta = requests.get(url, headers=cabecalhos, params=parametros)
+        resposta = api_get('/teams', params=parametros)
         
         if resposta.status_code == 200:
             dados = resposta.json()
@@ -204,9 +195,6 @@ def sincronizar_times():
         
         print(f"  ✅ {times_novos_liga} novos times, {vinculos_novos_liga} novos vínculos")
         ligas_processadas += 1
-        
-        # Delay entre requisições para não sobrecarregar a API
-        time.sleep(0.5)
     
     # Resumo final
     print("\n📊 Resumo da sincronização:")
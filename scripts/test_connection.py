@@ -4,7 +4,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.database import supabase
 from config.settings import settings
-import requests
+from config.api_football import api_get
 
 def testar_conexao_supabase():
     """Testa a conexão com o Supabase"""
@@ -27,14 +27,8 @@ def testar_api_football():
         print("❌ API_KEY não configurada!")
         return False
     
-    url = "https://v3.football.api-sports.io/status"
-    headers = {
-        'X-RapidAPI-Key': settings.api_key,
-        'X-RapidAPI-Host': 'v3.football.api-sports.io'
-    }
-    
     try:
-        resposta = requests.get(url, headers=headers)
+        resposta = api_get('/status')
         if resposta.status_code == 200:
             dados = resposta.json()
             print("✅ Conexão com API Football OK!")
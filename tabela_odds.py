@@ -0,0 +1,163 @@
+import re
+import numpy as np
+import pandas as pd
+
+# IDs das apostas usadas na tabela e linhas de Over (em ordem de preferência) para gols
+ID_APOSTA_RESULTADO = 1  # Match Winner
+ID_APOSTA_GOLS_CASA = 16  # Home Team Goals
+ID_APOSTA_GOLS_FORA = 17  # Away Team Goals
+LINHAS_OVER_GOLS = [0.5, 1.0, 1.5, 2.0, 2.5]
+
+# Colunas da tabela longa de odds
+COLUNAS_TABELA_ODDS = ['fixture_id', 'bookmaker_id', 'bet_id', 'label', 'line', 'odd']
+
+# "Over 2.5" -> ("Over", 2.5); "Home -1" -> ("Home", -1.0); "1:0" e "Home/Draw" não têm linha
+PADRAO_LINHA = re.compile(r'^(.*\S)\s+([+-]?\d+(?:\.\d+)?)$')
+
+
+def dividir_rotulo(valor):
+    """Separa o rótulo da aposta da linha numérica, se houver"""
+    correspondencia = PADRAO_LINHA.match(valor)
+    if correspondencia:
+        return correspondencia.group(1), float(correspondencia.group(2))
+    return valor, np.nan
+
+
+def tabela_odds_vazia():
+    """Tabela de odds sem linhas, com os tipos corretos"""
+    return normalizar_odds(None)
+
+
+def normalizar_odds(dados_odds):
+    """Converte a resposta paginada de /odds numa tabela longa e compacta
+
+    Uma linha por (fixture_id, bookmaker_id, bet_id, label, line) com a odd em float.
+    `label` é categórico e `line` fica separado do rótulo ("Over 0.5" -> "Over", 0.5),
+    o que permite comparações numéricas exatas em vez de buscas em strings.
+    """
+    fixture_ids, bookmaker_ids, bet_ids, labels, lines, odds = [], [], [], [], [], []
+    rotulos_divididos = {}
+
+    for item in (dados_odds or {}).get('response', []):
+        fixture_id = item['fixture']['id']
+        for bookmaker in item.get('bookmakers', []):
+            bookmaker_id = bookmaker.get('id')
+            for aposta in bookmaker.get('bets', []):
+                bet_id = aposta.get('id')
+                for valor in aposta.get('values', []):
+                    try:
+                        odd = float(valor.get('odd'))
+                    except (TypeError, ValueError):
+                        continue
+
+                    rotulo = str(valor.get('value', '')).strip()
+                    if rotulo not in rotulos_divididos:
+                        rotulos_divididos[rotulo] = dividir_rotulo(rotulo)
+                    label, line = rotulos_divididos[rotulo]
+
+                    fixture_ids.append(fixture_id)
+                    bookmaker_ids.append(bookmaker_id)
+                    bet_ids.append(bet_id)
+                    labels.append(label)
+                    lines.append(line)
+                    odds.append(odd)
+
+    return pd.DataFrame({
+        'fixture_id': np.array(fixture_ids, dtype=np.int64),
+        'bookmaker_id': np.array(bookmaker_ids, dtype=np.int16),
+        'bet_id': np.array(bet_ids, dtype=np.int16),
+        'label': pd.Categorical(labels),
+        'line': np.array(lines, dtype=np.float32),
+        'odd': np.array(odds, dtype=np.float64),
+    }, columns=COLUNAS_TABELA_ODDS)
+
+
+def melhor_over_gols(tabela, id_aposta, sufixo):
+    """Primeira linha de Over disponível (0.5, 1.0, 1.5...) por jogo para o mercado de gols"""
+    over = tabela[(tabela['bet_id'] == id_aposta) &
+                  (tabela['label'] == 'Over') &
+                  (tabela['line'].isin(LINHAS_OVER_GOLS))]
+    over = over.sort_values('line', kind='stable').drop_duplicates('fixture_id')
+
+    return pd.DataFrame({
+        f'odd_gols_{sufixo}': over['odd'].to_numpy(),
+        # float64 + object: com `over` vazio o map mantém o float32 e a concatenação falharia
+        f'legenda_gols_{sufixo}': ('Mais de ' + over['line'].astype(np.float64).map('{:.1f}'.format)
+                                   .astype(object)).to_numpy(dtype=object),
+        f'linha_gols_{sufixo}': over['line'].to_numpy(dtype=np.float64),
+    }, index=pd.Index(over['fixture_id'].to_numpy(), name='fixture_id'))
+
+
+def odds_principais_por_jogo(tabela, id_bookmaker=None):
+    """Odds usadas na tabela da aplicação (resultado e gols de cada time), uma linha por jogo
+
+    Sem `id_bookmaker`, vale a primeira ocorrência de cada mercado no jogo (mesmo
+    comportamento de ler `bookmakers[0]` da resposta crua).
+    """
+    if id_bookmaker is not None:
+        tabela = tabela[tabela['bookmaker_id'] == id_bookmaker]
+
+    resultado = tabela[tabela['bet_id'] == ID_APOSTA_RESULTADO].drop_duplicates(['fixture_id', 'label'])
+    resultado = resultado.pivot(index='fixture_id', columns='label', values='odd')
+    resultado = resultado.reindex(columns=['Home', 'Draw', 'Away'])
+    resultado.columns = ['odd_casa', 'odd_empate', 'odd_fora']
+
+    return resultado.join([
+        melhor_over_gols(tabela, ID_APOSTA_GOLS_CASA, 'casa'),
+        melhor_over_gols(tabela, ID_APOSTA_GOLS_FORA, 'fora'),
+    ], how='outer')
+
+
+def maior_odd(linhas, chaves):
+    """Linha de maior odd em cada grupo de `chaves` (em empate, a que aparece primeiro)"""
+    return linhas.sort_values('odd', ascending=False, kind='stable').drop_duplicates(chaves)
+
+
+def melhores_odds_por_jogo(tabela):
+    """Melhor preço de cada mercado principal entre todos os bookmakers da tabela, por jogo
+
+    Para resultado (casa/empate/fora) traz a maior odd e o bookmaker que a oferece.
+    Para gols de cada time usa a menor linha de Over disponível no jogo (0.5, 1.0...)
+    entre todos os bookmakers e, nela, a maior odd.
+    """
+    resultado = tabela[(tabela['bet_id'] == ID_APOSTA_RESULTADO) & tabela['label'].isin(['Home', 'Draw', 'Away'])]
+    resultado = maior_odd(resultado, ['fixture_id', 'label'])
+
+    colunas = {}
+    for label, sufixo in (('Home', 'casa'), ('Draw', 'empate'), ('Away', 'fora')):
+        linhas = resultado[resultado['label'] == label].set_index('fixture_id')
+        colunas[f'melhor_odd_{sufixo}'] = linhas['odd']
+        colunas[f'melhor_bookmaker_{sufixo}'] = linhas['bookmaker_id'].astype('Int64')
+
+    for id_aposta, sufixo in ((ID_APOSTA_GOLS_CASA, 'gols_casa'), (ID_APOSTA_GOLS_FORA, 'gols_fora')):
+        over = tabela[(tabela['bet_id'] == id_aposta) &
+                      (tabela['label'] == 'Over') &
+                      (tabela['line'].isin(LINHAS_OVER_GOLS))]
+        over = over[over['line'] == over.groupby('fixture_id')['line'].transform('min')]
+        linhas = maior_odd(over, ['fixture_id']).set_index('fixture_id')
+        colunas[f'melhor_odd_{sufixo}'] = linhas['odd']
+        colunas[f'melhor_linha_{sufixo}'] = linhas['line'].astype(np.float64)
+        colunas[f'melhor_bookmaker_{sufixo}'] = linhas['bookmaker_id'].astype('Int64')
+
+    melhores = pd.DataFrame(colunas)
+    melhores.index.name = 'fixture_id'
+    return melhores
+
+
+def atualizacoes_por_jogo(dados_odds, verificado_em=None):
+    """Momento da última atualização (`update`) das odds de cada jogo/bookmaker na resposta de /odds
+
+    `verificado_em` registra quando a resposta foi obtida (padrão: agora), usado para
+    decidir quais jogos estão com odds velhas na atualização incremental.
+    """
+    linhas = [
+        (item['fixture']['id'], bookmaker.get('id'), item.get('update'))
+        for item in (dados_odds or {}).get('response', [])
+        for bookmaker in item.get('bookmakers', [])
+    ]
+    atualizacoes = pd.DataFrame(linhas, columns=['fixture_id', 'bookmaker_id', 'atualizado_em'])
+
+    return atualizacoes.astype({'fixture_id': np.int64, 'bookmaker_id': np.int16}).assign(
+        atualizado_em=pd.to_datetime(atualizacoes['atualizado_em'], utc=True, errors='coerce'),
+        verificado_em=verificado_em or pd.Timestamp.now(tz='UTC'),
+    )